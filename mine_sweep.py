@@ -1,469 +1,586 @@
-# mine_sweep.py
-import sys
-import random
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QGridLayout,
-                             QVBoxLayout, QHBoxLayout, QPushButton, QSpinBox,
-                             QLabel, QMessageBox, QCheckBox)
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QTime
-from mine_sweep_logical_ai import MineSweeperLogicalAI
-from mine_sweep_training_ai import MineSweeperTrainingAI
-
-class MineButton(QPushButton):
-    leftClicked = pyqtSignal(int, int)
-    rightClicked = pyqtSignal(int, int)
-    middleClicked = pyqtSignal(int, int)
-
-    def __init__(self, x, y):
-        super().__init__()
-        self.x = x
-        self.y = y
-        self.is_revealed = False
-        self.is_flag = False
-        self.number = 0
-        self.setFixedSize(30, 30)
-        self.update_style()
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            self.leftClicked.emit(self.x, self.y)
-        elif event.button() == Qt.RightButton:
-            self.rightClicked.emit(self.x, self.y)
-        
-        # Check for middle click (both buttons pressed)
-        if event.buttons() == (Qt.LeftButton | Qt.RightButton):
-            self.middleClicked.emit(self.x, self.y)
-
-    def set_revealed(self, number):
-        self.is_revealed = True
-        self.is_flag = False
-        self.number = number
-        self.setText(str(number) if number != 0 else "")
-        self.update_style()
-
-    def set_flag(self, flag):
-        if not self.is_revealed:
-            self.is_flag = flag
-            self.setText("🚩" if flag else "")
-            self.update_style()
-
-    def update_style(self):
-        if self.is_revealed:
-            color_map = {
-                1: "blue", 2: "green", 3: "red",
-                4: "darkblue", 5: "brown", 6: "cyan",
-                7: "black", 8: "gray"
-            }
-            color = color_map.get(self.number, "black")
-            self.setStyleSheet(f"""
-                background-color: white;
-                color: {color};
-                border: 1px solid #ccc;
-            """)
-        else:
-            self.setStyleSheet("""
-                background-color: #bbb;
-                border: 1px solid #999;
-            """)
-
-class MineSweeperGame(QWidget):
-    ai_stop_callback = None
-    
-    def __init__(self):
-        super().__init__()
-        self.grid = QGridLayout()
-        self.grid.setSpacing(0)
-        self.setLayout(self.grid)
-        
-        self.rows = 0
-        self.cols = 0
-        self.mine_num = 0
-        self.mines = []
-        self.numbers = []
-        self.buttons = []
-        self.flags = []
-        self.revealed = []
-        self.is_first_click = True
-        self.game_over = False
-
-        # 计时器相关
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_time)
-        self.elapsed_time = QTime(0, 0)  # 记录游戏时间
-        self.time_elapsed_callback = None  # 用于更新 UI 的回调函数
-
-        # 剩余雷数回调
-        self.mine_count_callback = None 
-
-    def start_new_game(self, rows, cols, mine_num):
-        # Clear previous game
-        while self.grid.count():
-            item = self.grid.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-        
-        # Initialize game state
-        self.rows = rows
-        self.cols = cols
-        self.mine_num = min(mine_num, rows*cols-1)
-        self.is_first_click = True
-        self.game_over = False
-        
-        # Initialize arrays
-        self.mines = [[False for _ in range(cols)] for _ in range(rows)]
-        self.numbers = [[0 for _ in range(cols)] for _ in range(rows)]
-        self.flags = [[False for _ in range(cols)] for _ in range(rows)]
-        self.revealed = [[False for _ in range(cols)] for _ in range(rows)]
-        
-        # Create buttons
-        self.buttons = []
-        for x in range(rows):
-            row = []
-            for y in range(cols):
-                btn = MineButton(x, y)
-                btn.leftClicked.connect(self.handle_left_click)
-                btn.rightClicked.connect(self.handle_right_click)
-                btn.middleClicked.connect(self.handle_middle_click)
-                self.grid.addWidget(btn, x, y)
-                row.append(btn)
-            self.buttons.append(row)
-
-        self.elapsed_time = QTime(0, 0)
-        self.timer.stop()  # 重新开始游戏时停止计时
-        if self.time_elapsed_callback:
-            self.time_elapsed_callback(self.elapsed_time.toString("mm:ss"))
-        self.update_mine_count()
-
-    def generate_mines(self, safe_x, safe_y):
-        # Generate safe area
-        safe_area = set()
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                x = safe_x + dx
-                y = safe_y + dy
-                if 0 <= x < self.rows and 0 <= y < self.cols:
-                    safe_area.add((x, y))
-        
-        # Create list of possible mine positions
-        all_positions = [(x, y) for x in range(self.rows) for y in range(self.cols)]
-        safe_positions = [pos for pos in all_positions if pos not in safe_area]
-        
-        # Determine mine placements
-        mine_count = min(self.mine_num, len(all_positions)-len(safe_area))
-        mine_positions = random.sample(safe_positions, mine_count)
-        
-        # If we still need more mines, add from safe area (excluding first click)
-        if mine_count < self.mine_num:
-            remaining = self.mine_num - mine_count
-            extra_positions = [pos for pos in safe_area if pos != (safe_x, safe_y)]
-            mine_positions += random.sample(extra_positions, min(remaining, len(extra_positions)))
-        
-        # Place mines
-        for x, y in mine_positions:
-            self.mines[x][y] = True
-        
-        # Calculate numbers
-        for x in range(self.rows):
-            for y in range(self.cols):
-                count = 0
-                for dx in [-1, 0, 1]:
-                    for dy in [-1, 0, 1]:
-                        if dx == 0 and dy == 0:
-                            continue
-                        nx = x + dx
-                        ny = y + dy
-                        if 0 <= nx < self.rows and 0 <= ny < self.cols:
-                            if self.mines[nx][ny]:
-                                count += 1
-                self.numbers[x][y] = count
-
-    def handle_left_click(self, x, y):
-        if self.game_over or self.flags[x][y]:
-            return
-        
-        if self.is_first_click:
-            self.generate_mines(x, y)
-            self.is_first_click = False
-            self.timer.start(1000)
-        
-        if self.mines[x][y]:
-            self.game_over = True
-            self.timer.stop()
-            self.reveal_all()
-            self.game_end()
-            QMessageBox.information(self, "Game Over", "You hit a mine!")
-            self.buttons[x][y].setText("💀")
-            return
-        
-        self.reveal(x, y)
-        
-        if self.check_win():
-            self.game_over = True
-            self.timer.stop()
-            self.game_end()
-            QMessageBox.information(self, "Congratulations!", "You win!")
-
-    def handle_right_click(self, x, y):
-        if self.game_over or self.revealed[x][y]:
-            return
-        
-        self.flags[x][y] = not self.flags[x][y]
-        self.buttons[x][y].set_flag(self.flags[x][y])
-        self.update_mine_count()
-
-    def handle_middle_click(self, x, y):
-        if self.game_over or not self.revealed[x][y]:
-            return
-        
-        flag_count = 0
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                nx = x + dx
-                ny = y + dy
-                if 0 <= nx < self.rows and 0 <= ny < self.cols:
-                    if self.flags[nx][ny]:
-                        flag_count += 1
-        
-        if flag_count == self.numbers[x][y]:
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if dx == 0 and dy == 0:
-                        continue
-                    nx = x + dx
-                    ny = y + dy
-                    if 0 <= nx < self.rows and 0 <= ny < self.cols:
-                        if not self.revealed[nx][ny] and not self.flags[nx][ny]:
-                            if self.mines[nx][ny]:
-                                self.game_over = True
-                                self.reveal_all()
-                                QMessageBox.information(self, "Game Over", "You hit a mine!")
-                                return
-                            self.reveal(nx, ny)
-        
-        if self.check_win():
-            self.game_over = True
-            QMessageBox.information(self, "Congratulations!", "You win!")
-
-    def reveal(self, x, y):
-        if self.revealed[x][y] or self.flags[x][y]:
-            return
-        
-        self.revealed[x][y] = True
-        self.buttons[x][y].set_revealed(self.numbers[x][y])
-        
-        if self.numbers[x][y] == 0:
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if dx == 0 and dy == 0:
-                        continue
-                    nx = x + dx
-                    ny = y + dy
-                    if 0 <= nx < self.rows and 0 <= ny < self.cols:
-                        if not self.revealed[nx][ny]:
-                            self.reveal(nx, ny)
-
-    def check_win(self):
-        for x in range(self.rows):
-            for y in range(self.cols):
-                if (not self.mines[x][y] and not self.revealed[x][y]) or self.buttons[x][y].text() == "💣":
-                    return False
-        return True
-
-    def reveal_all(self):
-        for x in range(self.rows):
-            for y in range(self.cols):
-                if self.mines[x][y]:
-                    self.buttons[x][y].setText("💣")
-                    self.buttons[x][y].setStyleSheet("""
-                        background-color: red;
-                        color: black;
-                    """)
-
-    def update_time(self):
-        self.elapsed_time = self.elapsed_time.addSecs(1)
-        if self.time_elapsed_callback:
-            self.time_elapsed_callback(self.elapsed_time.toString("mm:ss"))
-
-    def update_mine_count(self):
-        remaining_mines = self.mine_num - sum(row.count(True) for row in self.flags)
-        if self.mine_count_callback:
-            self.mine_count_callback(remaining_mines)
-
-    def game_end(self):
-        if self.ai_stop_callback:
-            self.ai_stop_callback()
-
-    def get_unopened_unflagged_neighbors(self, x, y):
-        unopened_unflagged = set()
-        flagged_count = 0
-
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.rows and 0 <= ny < self.cols:
-                    neighbor = self.buttons[nx][ny]
-                    if not neighbor.is_revealed:
-                        if neighbor.is_flag:
-                            flagged_count += 1
-                        else:
-                            unopened_unflagged.add((nx, ny))
-
-        return unopened_unflagged, flagged_count
-    
-    def get_remaining_mines(self):
-        return self.mine_num - sum(row.count(True) for row in self.flags)
-    
-class MainWindow(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("Minesweeper")
-        
-        central_widget = QWidget()
-        self.setCentralWidget(central_widget)
-        layout = QVBoxLayout()
-        central_widget.setLayout(layout)
-        
-        # 顶部显示区域（时间 + 剩余雷数）
-        self.info_layout = QHBoxLayout()
-        self.time_label = QLabel("Time: 00:00")
-        self.mine_label = QLabel("Mines: 0")
-        self.info_layout.addWidget(self.time_label)
-        self.info_layout.addWidget(self.mine_label)
-
-        layout.addLayout(self.info_layout)
-
-        # Settings
-        settings = QHBoxLayout()
-        self.rows_spin = QSpinBox()
-        self.rows_spin.setRange(1, 50)
-        self.rows_spin.setValue(10)
-        self.cols_spin = QSpinBox()
-        self.cols_spin.setRange(1, 50)
-        self.cols_spin.setValue(10)
-        self.mines_spin = QSpinBox()
-        self.mines_spin.setRange(1, 2500)
-        self.mines_spin.setValue(15)
-        
-        self.start_btn = QPushButton("New Game")
-        self.start_btn.clicked.connect(self.new_game)
-
-        settings.addWidget(QLabel("Rows:"))
-        settings.addWidget(self.rows_spin)
-        settings.addWidget(QLabel("Cols:"))
-        settings.addWidget(self.cols_spin)
-        settings.addWidget(QLabel("Mines:"))
-        settings.addWidget(self.mines_spin)
-        settings.addWidget(self.start_btn)
-
-        layout.addLayout(settings)
-
-        # AI Controller
-        ai_controller = QHBoxLayout()
-        self.logical_ai_btn = QPushButton("Logical AI") 
-        self.logical_ai_btn.clicked.connect(self.toggle_logical_ai) 
-        self.logical_ai_probability_guess_btn = QCheckBox("With Probability Guess", self)
-        self.logical_ai_probability_guess_btn.clicked.connect(self.ai_probability_guess_clicked)
-
-        self.training_ai_btn = QPushButton("Training AI")
-        self.training_ai_btn.clicked.connect(self.toggle_training_ai)
-
-        ai_controller.addWidget(self.logical_ai_btn)
-        ai_controller.addWidget(self.logical_ai_probability_guess_btn)
-        ai_controller.addWidget(self.training_ai_btn)
-        layout.addLayout(ai_controller)
-
-        
-
-        # Game area
-        self.game = MineSweeperGame()
-        self.game.time_elapsed_callback = self.update_time_display
-        self.game.mine_count_callback = self.update_mine_display
-        self.game.ai_stop_callback = self.stop_ai_callback
-        
-        layout.addWidget(self.game)
-
-        self.logical_ai = MineSweeperLogicalAI(self.game)
-        self.logical_ai.ai_stop_callback = self.stop_logical_ai_callback
-        self.training_ai = MineSweeperTrainingAI(self.game)
-        self.training_ai.ai_stop_callback = self.stop_training_ai_callback        
-
-        self.update_mine_max()
-        self.rows_spin.valueChanged.connect(self.update_mine_max)
-        self.cols_spin.valueChanged.connect(self.update_mine_max)
-        
-        self.new_game()
-    
-    def toggle_logical_ai(self):
-        if self.logical_ai_btn.text() == "Logical AI":
-            if self.training_ai_btn.text() == "Training AI":
-                self.logical_ai.start_ai()
-                self.logical_ai_btn.setText("Stop Logical AI")
-                self.info_layout.addWidget(QLabel("AI Playing ..."))
-        else:
-            self.logical_ai.stop_ai()
-            self.logical_ai_btn.setText("Logical AI")
-            # 移除“AI操作中”的显示
-            for i in range(self.info_layout.count()):
-                widget = self.info_layout.itemAt(i).widget()
-                if widget and widget.text() == "AI Playing ...":
-                    self.info_layout.removeWidget(widget)
-                    widget.deleteLater()
-    
-    def toggle_training_ai(self):
-        if self.training_ai_btn.text() == "Training AI":
-            if self.logical_ai_btn.text() == "Logical AI":
-                self.training_ai.start_ai()
-                self.training_ai_btn.setText("Stop Training AI")
-                self.info_layout.addWidget(QLabel("AI Playing ..."))
-        else:
-            self.training_ai.stop_ai()
-            self.training_ai_btn.setText("Training AI")
-            # 移除“AI操作中”的显示
-            for i in range(self.info_layout.count()):
-                widget = self.info_layout.itemAt(i).widget()
-                if widget and widget.text() == "AI Playing ...":
-                    self.info_layout.removeWidget(widget)
-                    widget.deleteLater()
-
-    def stop_logical_ai_callback(self):
-        self.toggle_logical_ai()
-    
-    def stop_training_ai_callback(self):
-        self.toggle_training_ai()
-
-    def stop_ai_callback(self):
-        if self.logical_ai_btn.text() == "Logical AI":
-            self.stop_logical_ai_callback()
-        else:
-            self.stop_training_ai_callback()
-
-    def update_time_display(self, time_str):
-        self.time_label.setText(f"Time: {time_str}")
-
-    def update_mine_display(self, mine_count):
-        self.mine_label.setText(f"Mines: {mine_count}")
-
-    def new_game(self):
-        rows = self.rows_spin.value()
-        cols = self.cols_spin.value()
-        mines = self.mines_spin.value()
-        self.game.start_new_game(rows, cols, mines)
-        self.update_mine_display(mines)  # 重新开始游戏时更新雷数
-        if self.logical_ai_btn.text() == "Stop Logical AI":
-            self.toggle_logical_ai()
-        if self.training_ai_btn.text() == "Stop Training AI":
-            self.toggle_training_ai()
-    def update_mine_max(self):
-        max_mines = self.rows_spin.value() * self.cols_spin.value() - 1
-        self.mines_spin.setMaximum(max_mines)
-
-    def ai_probability_guess_clicked(self):
-        check_box = self.sender()
-        self.logical_ai.probability_guess_on = check_box.isChecked()
-
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
-    sys.exit(app.exec_())
+# mine_sweep.py
+import sys
+import threading
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget,
+                             QVBoxLayout, QHBoxLayout, QPushButton, QSpinBox,
+                             QLabel, QMessageBox, QCheckBox, QFileDialog, QSizePolicy, QScrollArea)
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QTime, QRect, QPoint
+from PyQt5.QtGui import QPainter, QPixmap, QColor, QImage
+import numpy as np
+from mine_sweep_engine import MineSweeperEngine
+from mine_sweep_logical_ai import MineSweeperLogicalAI
+from mine_sweep_training_ai import MineSweeperTrainingAI
+from mine_sweep_replay import record_game, save_replay
+
+CELL_SIZE = 30  # 默认每个格子的像素大小
+MIN_CELL_SIZE = 2  # 缩放范围
+MAX_CELL_SIZE = 60
+PIXMAP_MIN_CELL_SIZE = 12  # 格子小于该尺寸时不再绘制贴图，改为按颜色块整体绘制
+MAX_BOARD_SIZE = 2000  # 行/列数上限（400 万格）
+VIEWPORT_MAX_WIDTH = 1200  # 棋盘视口的初始最大尺寸，更大的棋盘滚动查看
+VIEWPORT_MAX_HEIGHT = 800
+
+# 格子状态编码：0~8 已打开的数字，其余如下；贴图和缩小后的颜色都按编码查表
+HIDDEN, FLAGGED, MINE, EXPLODED = 9, 10, 11, 12
+NUMBER_COLORS = {1: "blue", 2: "green", 3: "red", 4: "darkblue", 5: "brown", 6: "cyan", 7: "black", 8: "gray"}
+
+class MineBoardWidget(QWidget):
+    """自绘棋盘：一个控件绘制全部格子，按鼠标坐标换算出被点击的格子
+
+    放在滚动区域中，只绘制可见范围内的格子；Ctrl+滚轮缩放。
+    """
+    leftClicked = pyqtSignal(int, int)
+    rightClicked = pyqtSignal(int, int)
+    middleClicked = pyqtSignal(int, int)
+    zoomRequested = pyqtSignal(int, QPoint)  # (缩放步数, 鼠标位置)
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self.show_mines = False  # 游戏失败后显示所有雷
+        self.cell_size = CELL_SIZE
+        self.tiles = self.build_tiles()
+        self.state_colors = self.build_state_colors()
+        self.setFixedSize(0, 0)
+
+    def build_tiles(self):
+        """预先绘制每种格子状态的贴图，绘制时直接拷贝"""
+        tiles = [None] * (EXPLODED + 1)
+        tiles[HIDDEN] = self.make_tile("#bbb", "#999")
+        tiles[FLAGGED] = self.make_tile("#bbb", "#999", "🚩")
+        tiles[MINE] = self.make_tile("red", "red", "💣")
+        tiles[EXPLODED] = self.make_tile("red", "red", "💀")
+        for number in range(9):
+            tiles[number] = self.make_tile("white", "#ccc", str(number) if number != 0 else "",
+                                           NUMBER_COLORS.get(number, "black"))
+        return tiles
+
+    def build_state_colors(self):
+        """缩小后每种状态用一种颜色（0xAARRGGBB），数字格用数字颜色的浅色"""
+        colors = [QColor("white")]
+        for number in range(1, 9):
+            color = QColor(NUMBER_COLORS[number])
+            colors.append(QColor(*(255 - (255 - channel) * 2 // 5 for channel in color.getRgb()[:3])))
+        colors += [QColor("#bbb"), QColor("orangered"), QColor("black"), QColor("darkred")]
+        return np.array([color.rgb() for color in colors], dtype=np.uint32)
+
+    def make_tile(self, background, border, text="", color="black"):
+        size = self.cell_size
+        tile = QPixmap(size, size)
+        tile.fill(QColor(background))
+        painter = QPainter(tile)
+        painter.setPen(QColor(border))
+        painter.drawRect(0, 0, size - 1, size - 1)
+        if text:
+            font = painter.font()
+            font.setBold(True)
+            font.setPixelSize(max(1, size * 2 // 5))
+            painter.setFont(font)
+            painter.setPen(QColor(color))
+            painter.drawText(tile.rect(), Qt.AlignCenter, text)
+        painter.end()
+        return tile
+
+    def set_cell_size(self, size):
+        size = max(MIN_CELL_SIZE, min(MAX_CELL_SIZE, size))
+        if size == self.cell_size:
+            return False
+        self.cell_size = size
+        if size >= PIXMAP_MIN_CELL_SIZE:
+            self.tiles = self.build_tiles()
+        self.setFixedSize(self.engine.cols * size, self.engine.rows * size)
+        self.update()
+        return True
+
+    def reset_board(self):
+        self.show_mines = False
+        self.setFixedSize(self.engine.cols * self.cell_size, self.engine.rows * self.cell_size)
+        self.update()
+
+    def tile_codes(self, x_start, x_end, y_start, y_end):
+        """一块区域内每个格子的状态编码（数组运算，不逐格判断）"""
+        window = (slice(x_start, x_end), slice(y_start, y_end))
+        engine = self.engine
+        codes = np.where(engine.revealed[window], engine.numbers[window],
+                         np.where(engine.flags[window], FLAGGED, HIDDEN)).astype(np.int64)
+        if self.show_mines:
+            codes[engine.mines[window]] = MINE
+            if engine.exploded is not None:
+                ex, ey = engine.exploded
+                if x_start <= ex < x_end and y_start <= ey < y_end:
+                    codes[ex - x_start, ey - y_start] = EXPLODED
+        return codes
+
+    def paintEvent(self, event):
+        # 只重绘脏区域中可见的格子（在滚动区域中，不可见的部分不会画）
+        rect = event.rect() & self.visibleRegion().boundingRect()
+        size = self.cell_size
+        x_start = max(0, rect.top() // size)
+        x_end = min(self.engine.rows, rect.bottom() // size + 1)
+        y_start = max(0, rect.left() // size)
+        y_end = min(self.engine.cols, rect.right() // size + 1)
+        if x_start >= x_end or y_start >= y_end:
+            return
+
+        codes = self.tile_codes(x_start, x_end, y_start, y_end)
+        painter = QPainter(self)
+        if size >= PIXMAP_MIN_CELL_SIZE:
+            tiles = self.tiles
+            for x, row in enumerate(codes.tolist(), x_start):
+                for y, code in enumerate(row, y_start):
+                    painter.drawPixmap(y * size, x * size, tiles[code])
+        else:
+            # 格子太小时一个格子画成一个像素的图像，再整体放大
+            pixels = self.state_colors[codes].tobytes()  # QImage 不复制数据，字节串在绘制结束前一直有效
+            image = QImage(pixels, codes.shape[1], codes.shape[0], codes.shape[1] * 4, QImage.Format_RGB32)
+            painter.drawImage(QRect(y_start * size, x_start * size, (y_end - y_start) * size, (x_end - x_start) * size),
+                              image)
+        painter.end()
+
+    def update_cells(self, cells):
+        """把一批发生变化的格子合并成一个脏矩形，统一重绘"""
+        if not cells:
+            return
+        xs = [x for x, _ in cells]
+        ys = [y for _, y in cells]
+        size = self.cell_size
+        top, left = min(xs) * size, min(ys) * size
+        self.update(QRect(left, top, (max(ys) + 1) * size - left, (max(xs) + 1) * size - top))
+
+    def cell_at(self, pos):
+        x, y = pos.y() // self.cell_size, pos.x() // self.cell_size
+        if 0 <= x < self.engine.rows and 0 <= y < self.engine.cols:
+            return x, y
+        return None
+
+    def mousePressEvent(self, event):
+        cell = self.cell_at(event.pos())
+        if cell is None:
+            return
+        x, y = cell
+
+        if event.button() == Qt.LeftButton:
+            self.leftClicked.emit(x, y)
+        elif event.button() == Qt.RightButton:
+            self.rightClicked.emit(x, y)
+        
+        # Check for middle click (both buttons pressed)
+        if event.buttons() == (Qt.LeftButton | Qt.RightButton):
+            self.middleClicked.emit(x, y)
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.ControlModifier:
+            self.zoomRequested.emit(1 if event.angleDelta().y() > 0 else -1, event.pos())
+            event.accept()
+        else:
+            event.ignore()  # 交给滚动区域滚动
+
+class MineSweeperGame(QWidget):
+    """扫雷界面：规则与棋盘状态都在 MineSweeperEngine 中，这里只负责渲染和交互"""
+    ai_stop_callback = None
+    
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+        
+        self.engine = MineSweeperEngine(0, 0, 0)
+        self.board = MineBoardWidget(self.engine)
+        self.board.leftClicked.connect(self.handle_left_click)
+        self.board.rightClicked.connect(self.handle_right_click)
+        self.board.middleClicked.connect(self.handle_middle_click)
+        self.board.zoomRequested.connect(self.zoom)
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidget(self.board)
+        self.scroll_area.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.scroll_area)
+
+        # 计时器相关
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_time)
+        self.elapsed_time = QTime(0, 0)  # 记录游戏时间
+        self.time_elapsed_callback = None  # 用于更新 UI 的回调函数
+
+        # 剩余雷数回调
+        self.mine_count_callback = None 
+
+    @property
+    def rows(self):
+        return self.engine.rows
+
+    @property
+    def cols(self):
+        return self.engine.cols
+
+    @property
+    def mine_num(self):
+        return self.engine.mine_num
+
+    @property
+    def is_first_click(self):
+        return self.engine.is_first_click
+
+    @property
+    def game_over(self):
+        return self.engine.game_over
+
+    def start_new_game(self, rows, cols, mine_num):
+        # Initialize game state
+        self.engine.reset(rows, cols, mine_num)
+        self.board.reset_board()
+        self.fit_viewport()
+
+        self.elapsed_time = QTime(0, 0)
+        self.timer.stop()  # 重新开始游戏时停止计时
+        if self.time_elapsed_callback:
+            self.time_elapsed_callback(self.elapsed_time.toString("mm:ss"))
+        self.update_mine_count()
+
+    def handle_left_click(self, x, y):
+        was_first_click = self.engine.is_first_click
+        changed = self.engine.open_cell(x, y)
+        if changed is None:
+            return []
+
+        if was_first_click:
+            self.timer.start(1000)
+
+        self.apply_changes(changed)
+        self.check_game_end()
+        return changed
+
+    def handle_right_click(self, x, y):
+        if not self.engine.toggle_flag(x, y):
+            return
+        
+        self.board.update_cells([(x, y)])
+        self.update_mine_count()
+
+    def handle_middle_click(self, x, y):
+        changed = self.engine.chord(x, y)
+        if changed is None:
+            return []
+
+        self.apply_changes(changed)
+        self.check_game_end()
+        return changed
+
+    def apply_moves(self, opens, flags):
+        """批量执行一组打开和插旗，界面只在整批完成后刷新一次"""
+        was_first_click = self.engine.is_first_click
+        changed, moves = self.engine.apply_moves(opens, flags)
+        if not moves:
+            return changed, moves
+
+        if was_first_click:
+            self.timer.start(1000)
+
+        self.apply_changes(changed)
+        if flags:
+            self.update_mine_count()
+        self.check_game_end()
+        return changed, moves
+
+    def fit_viewport(self):
+        """视口大小跟随棋盘，超过上限时出现滚动条"""
+        frame = self.scroll_area.frameWidth() * 2
+        self.scroll_area.setMinimumSize(min(self.board.width(), VIEWPORT_MAX_WIDTH) + frame,
+                                        min(self.board.height(), VIEWPORT_MAX_HEIGHT) + frame)
+
+    def zoom(self, steps, pos):
+        """以鼠标所指的格子为中心缩放"""
+        old_size = self.board.cell_size
+        new_size = round(old_size * 1.25 ** steps)
+        if new_size == old_size:
+            new_size += steps
+        bars = [(self.scroll_area.horizontalScrollBar(), pos.x()), (self.scroll_area.verticalScrollBar(), pos.y())]
+        viewport_offsets = [offset - bar.value() for bar, offset in bars]  # 缩放前鼠标在视口中的位置
+        if not self.board.set_cell_size(new_size):
+            return
+        scale = self.board.cell_size / old_size
+        for (bar, offset), viewport_offset in zip(bars, viewport_offsets):
+            bar.setValue(round(offset * scale - viewport_offset))
+
+    def apply_changes(self, changed):
+        """把引擎返回的新打开格子一次性同步到棋盘上"""
+        self.board.update_cells(changed)
+
+    def check_game_end(self):
+        if not self.engine.game_over:
+            return
+
+        self.timer.stop()
+        if self.engine.win:
+            self.game_end()
+            QMessageBox.information(self, "Congratulations!", "You win!")
+        else:
+            self.reveal_all()
+            self.game_end()
+            QMessageBox.information(self, "Game Over", "You hit a mine!")
+
+    def reveal_all(self):
+        self.board.show_mines = True
+        self.board.update()
+
+    def update_time(self):
+        self.elapsed_time = self.elapsed_time.addSecs(1)
+        if self.time_elapsed_callback:
+            self.time_elapsed_callback(self.elapsed_time.toString("mm:ss"))
+
+    def update_mine_count(self):
+        remaining_mines = self.engine.get_remaining_mines()
+        if self.mine_count_callback:
+            self.mine_count_callback(remaining_mines)
+
+    def game_end(self):
+        if self.ai_stop_callback:
+            self.ai_stop_callback()
+
+    def get_unopened_unflagged_neighbors(self, x, y):
+        return self.engine.get_unopened_unflagged_neighbors(x, y)
+    
+    def get_remaining_mines(self):
+        return self.engine.get_remaining_mines()
+    
+class MainWindow(QMainWindow):
+    def __init__(self, prewarm_training_ai=False):
+        super().__init__()
+        self.setWindowTitle("Minesweeper")
+        
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout()
+        central_widget.setLayout(layout)
+        
+        # 顶部显示区域（时间 + 剩余雷数）
+        self.info_layout = QHBoxLayout()
+        self.time_label = QLabel("Time: 00:00")
+        self.mine_label = QLabel("Mines: 0")
+        self.info_layout.addWidget(self.time_label)
+        self.info_layout.addWidget(self.mine_label)
+        # 性能分析汇总（勾选 Profile 后显示），自动换行，不撑宽窗口
+        self.profile_label = QLabel("")
+        self.profile_label.setWordWrap(True)
+        self.profile_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Preferred)
+        self.profile_label.setVisible(False)
+        self.info_layout.addWidget(self.profile_label, 1)
+
+        layout.addLayout(self.info_layout)
+
+        # Settings
+        settings = QHBoxLayout()
+        self.rows_spin = QSpinBox()
+        self.rows_spin.setRange(1, MAX_BOARD_SIZE)
+        self.rows_spin.setValue(10)
+        self.cols_spin = QSpinBox()
+        self.cols_spin.setRange(1, MAX_BOARD_SIZE)
+        self.cols_spin.setValue(10)
+        self.mines_spin = QSpinBox()
+        self.mines_spin.setRange(1, 2500)
+        self.mines_spin.setValue(15)
+        
+        self.start_btn = QPushButton("New Game")
+        self.start_btn.clicked.connect(self.new_game)
+        self.save_replay_btn = QPushButton("Save Replay")
+        self.save_replay_btn.clicked.connect(self.save_replay)
+
+        settings.addWidget(QLabel("Rows:"))
+        settings.addWidget(self.rows_spin)
+        settings.addWidget(QLabel("Cols:"))
+        settings.addWidget(self.cols_spin)
+        settings.addWidget(QLabel("Mines:"))
+        settings.addWidget(self.mines_spin)
+        settings.addWidget(self.start_btn)
+        settings.addWidget(self.save_replay_btn)
+
+        layout.addLayout(settings)
+
+        # AI Controller
+        ai_controller = QHBoxLayout()
+        self.logical_ai_btn = QPushButton("Logical AI") 
+        self.logical_ai_btn.clicked.connect(self.toggle_logical_ai) 
+        self.logical_ai_probability_guess_btn = QCheckBox("With Probability Guess", self)
+        self.logical_ai_probability_guess_btn.clicked.connect(self.ai_probability_guess_clicked)
+        self.logical_ai_turbo_btn = QCheckBox("Turbo", self)
+        self.logical_ai_turbo_btn.clicked.connect(self.ai_turbo_clicked)
+
+        self.training_ai_btn = QPushButton("Training AI")
+        self.training_ai_btn.clicked.connect(self.toggle_training_ai)
+        self.profile_btn = QCheckBox("Profile", self)
+        self.profile_btn.clicked.connect(self.ai_profile_clicked)
+        self.export_profile_btn = QPushButton("Export Profile")
+        self.export_profile_btn.clicked.connect(self.export_profile)
+        self.export_profile_btn.setEnabled(False)
+
+        ai_controller.addWidget(self.logical_ai_btn)
+        ai_controller.addWidget(self.logical_ai_probability_guess_btn)
+        ai_controller.addWidget(self.logical_ai_turbo_btn)
+        ai_controller.addWidget(self.training_ai_btn)
+        ai_controller.addWidget(self.profile_btn)
+        ai_controller.addWidget(self.export_profile_btn)
+        layout.addLayout(ai_controller)
+
+        
+
+        # Game area
+        self.game = MineSweeperGame()
+        self.game.time_elapsed_callback = self.update_time_display
+        self.game.mine_count_callback = self.update_mine_display
+        self.game.ai_stop_callback = self.stop_ai_callback
+        
+        layout.addWidget(self.game)
+
+        self.logical_ai = MineSweeperLogicalAI(self.game)
+        self.logical_ai.ai_stop_callback = self.stop_logical_ai_callback
+        self.training_ai = MineSweeperTrainingAI(self.game)
+        self.training_ai.ai_stop_callback = self.stop_training_ai_callback
+        # 训练AI的依赖和模型在第一次点击时才加载；不可用时禁用按钮，可选在后台线程中预热
+        available, reason = self.training_ai.available()
+        if not available:
+            self.training_ai_btn.setEnabled(False)
+            self.training_ai_btn.setToolTip(reason)
+        elif prewarm_training_ai:
+            threading.Thread(target=self.training_ai.load, daemon=True).start()
+
+        self.profiled_ai = self.logical_ai  # 汇总显示最近运行过的 AI
+        self.profile_timer = QTimer(self)
+        self.profile_timer.timeout.connect(self.update_profile_display)
+
+        self.update_mine_max()
+        self.rows_spin.valueChanged.connect(self.update_mine_max)
+        self.cols_spin.valueChanged.connect(self.update_mine_max)
+        
+        self.new_game()
+    
+    def toggle_logical_ai(self):
+        if self.logical_ai_btn.text() == "Logical AI":
+            if self.training_ai_btn.text() == "Training AI":
+                self.logical_ai.start_ai()
+                self.profiled_ai = self.logical_ai
+                self.logical_ai_btn.setText("Stop Logical AI")
+                self.info_layout.addWidget(QLabel("AI Playing ..."))
+        else:
+            self.logical_ai.stop_ai()
+            self.logical_ai_btn.setText("Logical AI")
+            # 移除“AI操作中”的显示
+            for i in range(self.info_layout.count()):
+                widget = self.info_layout.itemAt(i).widget()
+                if widget and widget.text() == "AI Playing ...":
+                    self.info_layout.removeWidget(widget)
+                    widget.deleteLater()
+    
+    def load_training_ai(self):
+        """加载训练AI的模型（预热过则立即返回），失败时提示并禁用按钮"""
+        if self.training_ai.model is None:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                self.training_ai.load()
+            finally:
+                QApplication.restoreOverrideCursor()
+        if self.training_ai.model is None:
+            self.training_ai_btn.setEnabled(False)
+            self.training_ai_btn.setToolTip(self.training_ai.load_error)
+            QMessageBox.warning(self, "Training AI", f"Could not load the model:\n{self.training_ai.load_error}")
+            return False
+        return True
+
+    def toggle_training_ai(self):
+        if self.training_ai_btn.text() == "Training AI":
+            if self.logical_ai_btn.text() == "Logical AI" and self.load_training_ai():
+                if not self.training_ai.fits():
+                    size = self.training_ai.model.observation_space.shape[-1]
+                    QMessageBox.warning(self, "Training AI", f"The model only supports boards up to {size}x{size}.")
+                    return
+                self.training_ai.start_ai()
+                self.profiled_ai = self.training_ai
+                self.training_ai_btn.setText("Stop Training AI")
+                self.info_layout.addWidget(QLabel("AI Playing ..."))
+        else:
+            self.training_ai.stop_ai()
+            self.training_ai_btn.setText("Training AI")
+            # 移除“AI操作中”的显示
+            for i in range(self.info_layout.count()):
+                widget = self.info_layout.itemAt(i).widget()
+                if widget and widget.text() == "AI Playing ...":
+                    self.info_layout.removeWidget(widget)
+                    widget.deleteLater()
+
+    def stop_logical_ai_callback(self):
+        self.toggle_logical_ai()
+    
+    def stop_training_ai_callback(self):
+        self.toggle_training_ai()
+
+    def stop_ai_callback(self):
+        if self.logical_ai_btn.text() == "Stop Logical AI":
+            self.stop_logical_ai_callback()
+        elif self.training_ai_btn.text() == "Stop Training AI":
+            self.stop_training_ai_callback()
+
+    def update_time_display(self, time_str):
+        self.time_label.setText(f"Time: {time_str}")
+
+    def update_mine_display(self, mine_count):
+        self.mine_label.setText(f"Mines: {mine_count}")
+
+    def new_game(self):
+        rows = self.rows_spin.value()
+        cols = self.cols_spin.value()
+        mines = self.mines_spin.value()
+        self.game.start_new_game(rows, cols, mines)
+        self.update_mine_display(mines)  # 重新开始游戏时更新雷数
+        if self.logical_ai_btn.text() == "Stop Logical AI":
+            self.toggle_logical_ai()
+        if self.training_ai_btn.text() == "Stop Training AI":
+            self.toggle_training_ai()
+    def save_replay(self):
+        """保存当前对局的回放（种子、棋盘配置和操作记录），可用 mine_sweep_replay.py 无界面重放"""
+        engine = self.game.engine
+        path, _ = QFileDialog.getSaveFileName(self, "Save Replay", f"replay_{engine.seed}.json",
+                                              "Replay (*.json *.json.gz)")
+        if path:
+            save_replay(record_game(engine), path)
+
+    def update_mine_max(self):
+        max_mines = self.rows_spin.value() * self.cols_spin.value() - 1
+        self.mines_spin.setMaximum(max_mines)
+
+    def ai_probability_guess_clicked(self):
+        check_box = self.sender()
+        self.logical_ai.probability_guess_on = check_box.isChecked()
+
+    def ai_turbo_clicked(self):
+        check_box = self.sender()
+        self.logical_ai.set_turbo(check_box.isChecked())
+
+    def ai_profile_clicked(self):
+        """开关两个 AI 的分阶段计时；打开时每 0.5 秒刷新一次信息栏中的滚动汇总"""
+        enabled = self.profile_btn.isChecked()
+        for ai in (self.logical_ai, self.training_ai):
+            ai.profiler.enabled = enabled
+        self.profile_label.setVisible(enabled)
+        self.export_profile_btn.setEnabled(enabled)
+        if enabled:
+            self.profile_timer.start(500)
+            self.update_profile_display()
+        else:
+            self.profile_timer.stop()
+
+    def update_profile_display(self):
+        text = self.profiled_ai.profiler.summary_text()
+        self.profile_label.setText(text or "Profiling: waiting for AI steps ...")
+        self.profile_label.setToolTip(text.replace(" | ", "\n"))
+
+    def export_profile(self):
+        """把最近运行过的 AI 每一步的分阶段耗时和计数导出为 CSV"""
+        path, _ = QFileDialog.getSaveFileName(self, "Export Profile", "ai_profile.csv", "CSV (*.csv)")
+        if path:
+            self.profiled_ai.profiler.write_csv(path)
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    window = MainWindow(prewarm_training_ai="--prewarm" in sys.argv)  # --prewarm：启动后在后台加载训练AI
+    window.show()
+    sys.exit(app.exec_())
     
\ No newline at end of file
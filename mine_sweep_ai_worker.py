@@ -0,0 +1,49 @@
+# mine_sweep_ai_worker.py
+import queue
+import threading
+from PyQt5.QtCore import QObject, pyqtSignal
+
+class AIWorker(QObject):
+    """后台计算线程：在线程中执行推理，结果通过 Qt 信号回到界面线程处理
+
+    任务按提交顺序逐个执行；回调总是在界面线程中以 callback(结果, 异常) 调用，可以直接操作棋盘和界面。
+    训练AI的 torch 前向计算会释放 GIL；逻辑AI的回溯和采样是纯 Python，计算期间持有 GIL，
+    但解释器每隔 sys.getswitchinterval()（默认 5 毫秒）强制切换一次线程，界面事件最多延迟几个切换间隔。
+    用线程而不是进程：推理器的约束边界可以留在后台增量维护，每一步只需传递变化的格子。
+    """
+
+    finished = pyqtSignal(object, object, object)  # (回调, 结果, 异常)，跨线程发出时由 Qt 排队到界面线程
+
+    def __init__(self, name="ai-worker"):
+        super().__init__()
+        self.tasks = queue.Queue()
+        self.pending = 0  # 已提交但结果尚未回到界面线程的任务数（只在界面线程中读写）
+        self.finished.connect(self.on_finished)
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, function, *args, callback=None):
+        """在后台线程中执行 function(*args)，完成后在界面线程中调用 callback(结果, 异常)，成功时异常为 None"""
+        self.pending += 1
+        self.tasks.put((function, args, callback))
+
+    def run(self):
+        while True:
+            function, args, callback = self.tasks.get()
+            try:
+                result = function(*args)
+            except Exception as e:
+                # 异常带回界面线程交给回调处理（回调负责清除推理中的状态并停止 AI）
+                self.finished.emit(callback, None, e)
+            else:
+                self.finished.emit(callback, result, None)
+
+    def on_finished(self, callback, result, error):
+        self.pending -= 1
+        if callback is not None:
+            callback(result, error)
+        elif error is not None:
+            raise error
+
+if __name__ == "__main__":
+    print("这是扫雷AI的后台计算线程")
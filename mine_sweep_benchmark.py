@@ -0,0 +1,254 @@
+# mine_sweep_benchmark.py
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import time
+import numpy as np
+from mine_sweep_cache import COMPONENT_CACHE
+from mine_sweep_engine import MineSweeperEngine
+from mine_sweep_profiler import Profiler
+from mine_sweep_replay import record_game, save_replay
+from mine_sweep_solver import MineSweeperSolver
+
+# 标准难度：名称 -> (行, 列, 雷数)
+BOARD_CONFIGS = {
+    "beginner": (9, 9, 10),
+    "intermediate": (16, 16, 40),
+    "expert": (16, 30, 99),
+}
+
+POLICIES = ["logical", "logical_guess", "ppo"]
+
+def play_logical_game(engine, guess, rng=random, on_decision=None, first_click=None, profiler=None):
+    """无界面运行逻辑AI直到游戏结束或无法继续
+
+    每轮推理出的所有操作作为一批执行（与极速模式相同）。
+    first_click 为空时随机选择首次点击的位置。
+    on_decision(opens, flags, changed) 在每批操作执行后调用。
+    profiler 为开启的 Profiler 时，每批操作记为一步（各阶段耗时、边界大小、推出的格子数等）。
+    返回 (猜测次数, 每次决策的耗时列表, 各推理阶段统计)；一次决策包括推理、猜测、执行和同步整批操作
+    """
+    solver = MineSweeperSolver(engine, profiler=profiler)
+    profiler = solver.profiler
+    guesses = 0
+    latencies = []
+
+    start = time.perf_counter()
+    x, y = first_click or (rng.randrange(engine.rows), rng.randrange(engine.cols))
+    changed = engine.open_cell(x, y)
+    solver.sync(changed)
+    latencies.append(time.perf_counter() - start)
+    if on_decision:
+        on_decision([(x, y)], [], changed)
+
+    while not engine.game_over:
+        start = time.perf_counter()
+        with profiler.phase("infer"):
+            to_open, to_flag = solver.infer()
+        to_open = list(dict.fromkeys(to_open))
+        to_flag = list(dict.fromkeys(to_flag))
+        if not to_open and not to_flag:
+            if not guess:
+                break
+            with profiler.phase("guess"):
+                cell = solver.best_guess(rng)
+            if cell is None:
+                break
+            guesses += 1
+            profiler.add("guesses")
+            to_open = [cell]
+
+        with profiler.phase("apply"):
+            changed, moves = engine.apply_moves(to_open, to_flag)
+        with profiler.phase("sync"):
+            solver.sync(changed, moves)
+        latencies.append(time.perf_counter() - start)
+        profiler.record("moves", moves)
+        profiler.end_step()
+        if on_decision:
+            on_decision(to_open, to_flag, changed)
+
+    return guesses, latencies, solver.stage_stats
+
+# 每个工作进程缓存一次加载好的模型
+_ppo_model = None
+
+def load_ppo_model(model_path):
+    global _ppo_model
+    if _ppo_model is None:
+        import torch
+        from mine_sweep_observation import load_model
+        torch.set_num_threads(1)
+        _ppo_model = load_model(model_path)
+    return _ppo_model
+
+def play_ppo_game(rows, cols, mines, model_path, seed=None, profiler=None):
+    """用训练好的 PPO 策略在训练环境中玩一局（与训练时规则一致：开局即布雷，只在合法动作中选择）"""
+    from mine_sweep_observation import predict_masked
+    from mine_sweep_to_train_ai import MineSweeperEnv
+    profiler = profiler or Profiler()
+    model = load_ppo_model(model_path)
+    env = MineSweeperEnv(rows, cols, mines, obs_size=model.observation_space.shape[-1])
+    state, _ = env.reset(seed=seed)
+    latencies = []
+    done = False
+    while not done:
+        start = time.perf_counter()
+        with profiler.phase("masks"):
+            masks = env.action_masks()
+        with profiler.phase("predict"):
+            action = predict_masked(model, state, masks, deterministic=True)
+        with profiler.phase("step"):
+            state, _, done, _, _ = env.step(action)
+        latencies.append(time.perf_counter() - start)
+        profiler.end_step()
+    return env.game, latencies
+
+def init_worker(model_path):
+    """工作进程初始化：需要时预先加载模型，避免把加载时间算进第一局"""
+    if model_path:
+        load_ppo_model(model_path)
+
+def run_game(task):
+    """在工作进程中运行一局，返回该局的统计数据；棋盘和 AI 的随机选择都由 seed 决定"""
+    policy, config_name, rows, cols, mines, seed, model_path, replay_dir, profile = task
+
+    profiler = Profiler(enabled=profile)
+    start = time.perf_counter()
+    guesses = 0
+    stage_stats = {}
+    hits, misses = COMPONENT_CACHE.hits, COMPONENT_CACHE.misses  # 置换表在进程内跨局共享，只统计本局的增量
+    if policy == "ppo":
+        engine, latencies = play_ppo_game(rows, cols, mines, model_path, seed, profiler)
+        moves = len(latencies)  # 每次决策算一步
+    else:
+        engine = MineSweeperEngine(rows, cols, mines, seed=seed)
+        guesses, latencies, stage_stats = play_logical_game(engine, guess=(policy == "logical_guess"),
+                                                            rng=random.Random(f"ai-{seed}-0"), profiler=profiler)
+        moves = engine.version
+    duration = time.perf_counter() - start
+
+    if replay_dir:
+        save_replay(record_game(engine), os.path.join(replay_dir, f"{policy}_{config_name}_{seed}.json.gz"))
+
+    return {
+        "policy": policy,
+        "config": config_name,
+        "seed": seed,
+        "win": bool(engine.win),
+        "moves": moves,
+        "guesses": guesses,
+        "duration": duration,
+        "latencies": latencies,
+        "stage_time": {name: stats["time"] for name, stats in stage_stats.items()},
+        "cache_hits": COMPONENT_CACHE.hits - hits,
+        "cache_misses": COMPONENT_CACHE.misses - misses,
+        "cache_bytes": COMPONENT_CACHE.bytes,
+        "steps": [{"policy": policy, "config": config_name, "seed": seed, "step": i, **step}
+                  for i, step in enumerate(profiler.steps)],
+    }
+
+def summarize(results, wall_time):
+    """按 (策略, 棋盘) 汇总各局结果"""
+    groups = {}
+    for result in results:
+        groups.setdefault((result["policy"], result["config"]), []).append(result)
+
+    summary = []
+    for (policy, config_name), games in sorted(groups.items()):
+        # 分位数按决策统计（一批操作算一次），每步平均耗时单独按操作数折算
+        latencies = np.array([t for game in games for t in game["latencies"]]) * 1000
+        total_moves = sum(game["moves"] for game in games)
+        cpu_time = sum(game["duration"] for game in games)
+        lookups = sum(game["cache_hits"] + game["cache_misses"] for game in games)
+        row = {
+            "policy": policy,
+            "config": config_name,
+            "games": len(games),
+            "win_rate": sum(game["win"] for game in games) / len(games),
+            "avg_moves": float(np.mean([game["moves"] for game in games])),
+            "avg_guesses": float(np.mean([game["guesses"] for game in games])),
+            "avg_decisions": latencies.size / len(games),
+            "decision_p50_ms": float(np.percentile(latencies, 50)) if latencies.size else 0.0,
+            "decision_p90_ms": float(np.percentile(latencies, 90)) if latencies.size else 0.0,
+            "decision_p99_ms": float(np.percentile(latencies, 99)) if latencies.size else 0.0,
+            "decision_max_ms": float(latencies.max()) if latencies.size else 0.0,
+            "move_avg_ms": float(latencies.sum()) / total_moves if total_moves else 0.0,
+            "games_per_sec": len(games) / cpu_time if cpu_time else 0.0,
+            "cache_hit_rate": sum(game["cache_hits"] for game in games) / lookups if lookups else 0.0,
+            "cache_mb": max(game["cache_bytes"] for game in games) / 2 ** 20,
+        }
+        for game in games:
+            for name, seconds in game["stage_time"].items():
+                row[f"stage_{name}_ms"] = row.get(f"stage_{name}_ms", 0.0) + seconds * 1000 / len(games)
+        summary.append(row)
+    return {"wall_time": wall_time, "games_per_sec": len(results) / wall_time if wall_time else 0.0,
+            "results": summary}
+
+def parse_custom(value):
+    """解析自定义棋盘 ROWSxCOLSxMINES"""
+    try:
+        rows, cols, mines = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"自定义棋盘格式应为 ROWSxCOLSxMINES：{value}")
+    return rows, cols, mines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="扫雷 AI 无界面基准测试")
+    parser.add_argument("--games", type=int, default=100, help="每种 (策略, 棋盘) 组合的局数")
+    parser.add_argument("--configs", nargs="*", default=list(BOARD_CONFIGS), choices=list(BOARD_CONFIGS),
+                        help="标准难度")
+    parser.add_argument("--custom", nargs="*", type=parse_custom, default=[], help="自定义棋盘 ROWSxCOLSxMINES")
+    parser.add_argument("--policies", nargs="*", default=["logical", "logical_guess"], choices=POLICIES)
+    parser.add_argument("--model", default="minesweeper_ppo.zip", help="PPO 模型路径")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="进程数")
+    parser.add_argument("--seed", type=int, default=0, help="第一局的随机种子，之后依次加一")
+    parser.add_argument("--json", help="输出 JSON 文件")
+    parser.add_argument("--csv", help="输出 CSV 文件")
+    parser.add_argument("--replay-dir", help="把每一局的回放保存到该目录（可用 mine_sweep_replay.py 重放）")
+    parser.add_argument("--phases-csv", help="记录每一步的分阶段耗时和计数，写入该 CSV 文件")
+    args = parser.parse_args(argv)
+
+    configs = [(name, *BOARD_CONFIGS[name]) for name in args.configs]
+    configs += [(f"{rows}x{cols}x{mines}", rows, cols, mines) for rows, cols, mines in args.custom]
+    if args.replay_dir:
+        os.makedirs(args.replay_dir, exist_ok=True)
+    tasks = [(policy, name, rows, cols, mines, args.seed + i, args.model, args.replay_dir, bool(args.phases_csv))
+             for policy in args.policies
+             for name, rows, cols, mines in configs
+             for i in range(args.games)]
+
+    start = time.perf_counter()
+    preload = args.model if "ppo" in args.policies else None
+    with multiprocessing.Pool(args.processes, initializer=init_worker, initargs=(preload,)) as pool:
+        results = list(pool.imap_unordered(run_game, tasks, chunksize=max(1, len(tasks) // (args.processes * 8))))
+    report = summarize(results, time.perf_counter() - start)
+
+    for row in report["results"]:
+        print(f"{row['policy']:>14} {row['config']:>14}  games={row['games']}  win={row['win_rate']:.3f}  "
+              f"moves={row['avg_moves']:.1f}  guesses={row['avg_guesses']:.2f}  "
+              f"决策 p50={row['decision_p50_ms']:.3f}ms p99={row['decision_p99_ms']:.3f}ms "
+              f"max={row['decision_max_ms']:.1f}ms  每步={row['move_avg_ms']:.3f}ms  "
+              f"cache={row['cache_hit_rate']:.1%}/{row['cache_mb']:.1f}MB  {row['games_per_sec']:.1f} 局/秒")
+    print(f"总计 {len(results)} 局，用时 {report['wall_time']:.2f} 秒，{report['games_per_sec']:.1f} 局/秒")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.phases_csv:
+        steps = [step for result in sorted(results, key=lambda r: (r["policy"], r["config"], r["seed"]))
+                 for step in result["steps"]]
+        Profiler().write_csv(args.phases_csv, steps)
+    if args.csv:
+        fields = list(dict.fromkeys(key for row in report["results"] for key in row))
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(report["results"])
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# mine_sweep_cache.py
+import sys
+from collections import OrderedDict
+from mine_sweep_engine import NEIGHBOR_MASK_OFFSETS
+
+# 8 种对称变换（旋转、翻转）：(a, b, c, d) 表示 x' = a*x + b*y, y' = c*x + d*y
+SYMMETRIES = [(1, 0, 0, 1), (1, 0, 0, -1), (-1, 0, 0, 1), (-1, 0, 0, -1),
+              (0, 1, 1, 0), (0, 1, -1, 0), (0, -1, 1, 0), (0, -1, -1, 0)]
+
+# 邻格偏移 -> 位下标，与引擎的邻格位掩码一致
+NEIGHBOR_BITS = {(dx, dy): i for i, (dx, dy) in
+                 enumerate((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0))}
+
+# SYMMETRY_MASKS[s][m]：8 位邻格掩码 m 经过第 s 种对称变换后的掩码，查表代替逐个变换邻格
+SYMMETRY_MASKS = [[sum(1 << NEIGHBOR_BITS[(a * dx + b * dy, c * dx + d * dy)] for dx, dy in offsets)
+                   for offsets in NEIGHBOR_MASK_OFFSETS] for a, b, c, d in SYMMETRIES]
+
+def canonical_component(constraints, constraint_cells, unknowns, max_mines):
+    """分量的规范编码：与平移、旋转、翻转无关
+
+    每个约束编码为 (相对位置, 剩余雷数, 未知邻格的 8 位掩码)，在 8 种对称变换下取字典序最小的一种。
+    返回 (键, 按规范顺序排列的未知格)；缓存中按规范顺序的下标保存结果，查到后用这个顺序映射回棋盘格子。
+    """
+    best = None
+    for (a, b, c, d), remap in zip(SYMMETRIES, SYMMETRY_MASKS):
+        points = [(a * x + b * y, c * x + d * y) for x, y in constraint_cells]
+        origin_x = min(px for px, _ in points)
+        origin_y = min(py for _, py in points)
+        entries = []
+        for (x, y), (px, py) in zip(constraint_cells, points):
+            remaining, _, bits = constraints[(x, y)]
+            entries.append((px - origin_x, py - origin_y, remaining, remap[bits]))
+        entries.sort()
+        if best is None or entries < best[0]:
+            best = (entries, (a, b, c, d))
+
+    entries, (a, b, c, d) = best
+    order = sorted(unknowns, key=lambda cell: (a * cell[0] + b * cell[1], c * cell[0] + d * cell[1]))
+    # 分量内的雷数不会超过未知格数，更大的上限不影响结果，不必区分
+    key = (min(max_mines, len(unknowns)),) + tuple(value for entry in entries for value in entry)
+    return key, order
+
+def deep_size(obj):
+    """粗略估计缓存条目占用的内存（字节）"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k) + deep_size(v) for k, v in obj.items())
+    elif isinstance(obj, (tuple, list)):
+        size += sum(deep_size(item) for item in obj)
+    return size
+
+class ComponentCache:
+    """分量求解结果的置换表：按规范编码查找，超过内存上限时淘汰最久未使用的条目"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # 键 -> (值, 估计字节数)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        size = deep_size(key) + deep_size(value)
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def clear(self):
+        """清空条目，命中、未命中和淘汰计数也一起归零"""
+        self.entries.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self.entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "evictions": self.evictions}
+
+    def report(self):
+        stats = self.stats()
+        return (f"cache: entries={stats['entries']} memory={stats['bytes'] / 1024:.0f}KB "
+                f"hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.1%} "
+                f"evictions={stats['evictions']}")
+
+# 进程内共享的置换表：同一进程中的所有推理器（逻辑AI、基准测试的每一局）共用，跨局复用求解结果
+COMPONENT_CACHE = ComponentCache()
+
+if __name__ == "__main__":
+    print("这是扫雷推理器的分量置换表")
@@ -0,0 +1,171 @@
+# mine_sweep_check.py
+import argparse
+import itertools
+import math
+import random
+import sys
+import time
+import numpy as np
+from mine_sweep_cache import ComponentCache
+from mine_sweep_engine import MineSweeperEngine, neighbor_bits
+from mine_sweep_solver import MineSweeperSolver
+
+# 暴力枚举的布雷方案数上限，超过时跳过该局面
+BRUTE_MAX_PLACEMENTS = 200000
+
+def brute_force_probabilities(engine):
+    """枚举未知格上所有满足全部数字约束和剩余雷数的布雷方案，返回 {未知格: 雷概率}；无解时返回 None"""
+    unknown = [(x, y) for x in range(engine.rows) for y in range(engine.cols)
+               if not engine.revealed[x, y] and not engine.flags[x, y]]
+    index = {cell: i for i, cell in enumerate(unknown)}
+    constraints = []
+    for x in range(engine.rows):
+        for y in range(engine.cols):
+            if engine.revealed[x, y]:
+                neighbors = engine.neighbors(x, y)
+                flagged = sum(bool(engine.flags[n]) for n in neighbors)
+                cells = [index[n] for n in neighbors if n in index]
+                constraints.append((int(engine.numbers[x, y]) - flagged, cells))
+
+    remaining = engine.get_remaining_mines()
+    counts = [0] * len(unknown)
+    total = 0
+    if 0 <= remaining <= len(unknown):
+        for placement in itertools.combinations(range(len(unknown)), remaining):
+            mines = set(placement)
+            if all(sum(i in mines for i in cells) == number for number, cells in constraints):
+                total += 1
+                for i in placement:
+                    counts[i] += 1
+    if total == 0:
+        return None
+    return {cell: counts[i] / total for cell, i in index.items()}
+
+def random_states(games, seed, rows=5, cols=5, min_mines=3, max_mines=8):
+    """用逻辑AI玩随机的小棋盘，逐个产生途中的局面 (引擎, 推理器)；偶尔随机插旗（可能插错）
+
+    rows、cols 可以是 (最小, 最大) 区间，每局随机取值。
+    """
+    for game in range(games):
+        rng = random.Random(seed + game)
+        rows_range, cols_range = (value if isinstance(value, tuple) else (value, value) for value in (rows, cols))
+        rows, cols = rng.randint(*rows_range), rng.randint(*cols_range)
+        mines = rng.randint(min_mines, max_mines) if max_mines else int(rows * cols * rng.uniform(0.1, 0.2))
+        engine = MineSweeperEngine(rows, cols, mines, seed=seed + game)
+        solver = MineSweeperSolver(engine)
+        solver.sync(engine.open_cell(rng.randrange(rows), rng.randrange(cols)))
+        while not engine.game_over:
+            yield engine, solver
+            unknown = [(x, y) for x in range(rows) for y in range(cols)
+                       if not engine.revealed[x, y] and not engine.flags[x, y]]
+            if unknown and rng.random() < 0.1:
+                engine.toggle_flag(*rng.choice(unknown))
+                solver.sync(None)
+                continue
+            to_open, to_flag = solver.infer()
+            if not to_open and not to_flag:
+                cell = solver.best_guess(rng)
+                if cell is None:
+                    break
+                to_open = [cell]
+            changed, moves = engine.apply_moves(to_open, to_flag)
+            solver.sync(changed, moves)
+
+def check_probabilities(games=200, seed=0):
+    """推理器的雷概率（含内部格子）与暴力枚举一致；返回检查过的局面数"""
+    checked = 0
+    for engine, solver in random_states(games, seed):
+        unknown = engine.mine_num + engine.safe_remaining - engine.flag_count
+        if math.comb(unknown, max(0, min(unknown, engine.get_remaining_mines()))) > BRUTE_MAX_PLACEMENTS:
+            continue
+        expected = brute_force_probabilities(engine)
+        result = solver.probabilities()
+        if expected is None or result is None:
+            assert expected is None and result is None, (engine.seed, engine.moves, expected, result)
+        else:
+            probability_map, interior_prob, _, confidence = result
+            assert confidence["exact"], (engine.seed, engine.moves)
+            for cell, p in expected.items():
+                q = probability_map.get(cell, interior_prob)
+                assert abs(p - q) < 1e-9, (engine.seed, engine.moves, cell, p, q)
+        checked += 1
+    return checked
+
+def transformed_board(engine, rotations, flip):
+    """把棋盘旋转 rotations 个 90 度（flip 时先左右翻转）后的快照，以及原格子 -> 新格子的映射"""
+    def transform(array):
+        return np.rot90(array[:, ::-1] if flip else array, rotations).copy()
+
+    board = engine.snapshot()
+    board.revealed, board.flags, board.numbers = map(transform, (board.revealed, board.flags, board.numbers))
+    board.rows, board.cols = board.revealed.shape
+    board.unknown_bits = neighbor_bits(~board.revealed & ~board.flags)
+    board.flag_bits = neighbor_bits(board.flags)
+    index = transform(np.arange(engine.rows * engine.cols).reshape(engine.rows, engine.cols))
+    mapping = {divmod(int(cell), engine.cols): (x, y) for (x, y), cell in np.ndenumerate(index)}
+    return board, mapping
+
+def assert_same_probabilities(expected, actual, mapping, context):
+    (expected_map, expected_interior, _, _), (actual_map, actual_interior, _, _) = expected, actual
+    assert abs(expected_interior - actual_interior) < 1e-9, (context, expected_interior, actual_interior)
+    assert len(expected_map) == len(actual_map), context
+    for cell, p in expected_map.items():
+        q = actual_map[mapping[cell]]
+        assert abs(p - q) < 1e-9, (context, cell, p, q)
+
+def check_cache(games=200, seed=0):
+    """置换表不改变结果：带缓存与不带缓存的精确推理和雷概率一致，旋转、翻转后的棋盘查表得到对应的结果"""
+    cache = ComponentCache()
+    rng = random.Random(seed)
+    checked = 0
+    for engine, _ in random_states(games, seed, rows=(8, 16), cols=(8, 16), max_mines=None):
+        uncached = MineSweeperSolver(engine, cache=None)
+        cached = MineSweeperSolver(engine, cache=cache)
+        uncached.rebuild()
+        cached.rebuild()
+        context = (engine.seed, engine.moves)
+        expected_open, expected_flag = uncached.infer_exact()
+        actual_open, actual_flag = cached.infer_exact()
+        assert set(expected_open) == set(actual_open) and set(expected_flag) == set(actual_flag), context
+
+        expected = uncached.probabilities()
+        actual = cached.probabilities()
+        if expected is None or actual is None:
+            assert expected is None and actual is None, context
+            continue
+        if not expected[3]["exact"]:  # 有分量用了蒙特卡洛采样，结果带随机性，不比较
+            continue
+        identity = {cell: cell for cell in expected[0]}
+        assert_same_probabilities(expected, actual, identity, context)
+
+        board, mapping = transformed_board(engine, rng.randrange(4), rng.random() < 0.5)
+        symmetric = MineSweeperSolver(board, cache=cache)
+        symmetric.rebuild()
+        assert_same_probabilities(expected, symmetric.probabilities(), mapping, context)
+        checked += 1
+    assert cache.hits > 0, "置换表没有命中过"
+    return checked
+
+CHECKS = {"probabilities": check_probabilities, "cache": check_cache}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="推理器自检：在随机局面上与暴力枚举等参考实现比较，不一致时报错退出")
+    parser.add_argument("--games", type=int, default=200, help="每项检查的对局数")
+    parser.add_argument("--seed", type=int, default=0, help="第一局的随机种子，之后依次加一")
+    parser.add_argument("--only", choices=list(CHECKS), nargs="*", help="只运行这些检查（默认全部）")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name in args.only or CHECKS:
+        start = time.perf_counter()
+        try:
+            checked = CHECKS[name](args.games, args.seed)
+        except AssertionError as e:
+            failed = True
+            print(f"{name}: 不一致 {e}")
+        else:
+            print(f"{name}: 通过，检查了 {checked} 个局面，用时 {time.perf_counter() - start:.1f} 秒")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+# mine_sweep_engine.py
+import random
+import time
+import numpy as np
+
+# 周围 8 格的偏移量
+NEIGHBOR_DX = np.array([-1, -1, -1, 0, 0, 1, 1, 1], dtype=np.int64)
+NEIGHBOR_DY = np.array([-1, 0, 1, -1, 1, -1, 0, 1], dtype=np.int64)
+NEIGHBOR_OFFSETS = list(zip(NEIGHBOR_DX.tolist(), NEIGHBOR_DY.tolist()))
+
+# 邻格位掩码：第 k 位对应第 k 个偏移；第 k 个邻格看这个格子，是它的第 7 - k 个邻格。
+# NEIGHBOR_MASK_OFFSETS[m] 为 8 位掩码 m 中为 1 的位对应的偏移
+NEIGHBOR_MASK_OFFSETS = [tuple(offset for k, offset in enumerate(NEIGHBOR_OFFSETS) if mask >> k & 1)
+                         for mask in range(256)]
+
+# 超过该格数的棋盘用 NumPy 抽样布雷（random.sample 在百万格的棋盘上要数秒）；
+# 不超过时仍用 random.sample，已保存的回放（界面原先最大 50x50）布雷结果不变
+LARGE_BOARD_CELLS = 2500
+
+def count_neighbor_mines(mines):
+    """用平移求和一次性计算每个格子周围 8 格的雷数；最后两维是棋盘，前面可以有批次维"""
+    *batch, rows, cols = mines.shape
+    padded = np.zeros((*batch, rows + 2, cols + 2), dtype=np.int8)
+    padded[..., 1:-1, 1:-1] = mines
+    numbers = np.zeros((*batch, rows, cols), dtype=np.int8)
+    for dx in (0, 1, 2):
+        for dy in (0, 1, 2):
+            if (dx, dy) != (1, 1):
+                numbers += padded[..., dx:dx + rows, dy:dy + cols]
+    return numbers
+
+def neighbor_bits(mask):
+    """把每个格子周围 8 格的 mask 编码成 uint8 位掩码，棋盘外的邻格为 0"""
+    rows, cols = mask.shape
+    padded = np.zeros((rows + 2, cols + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1] = mask
+    bits = np.zeros((rows, cols), dtype=np.uint8)
+    for k, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+        bits |= padded[1 + dx:1 + dx + rows, 1 + dy:1 + dy + cols] << np.uint8(k)
+    return bits
+
+class MineSweeperEngine:
+    """无界面的扫雷规则引擎：GUI、逻辑AI 和训练环境共用同一份棋盘状态"""
+
+    def __init__(self, rows=10, cols=10, mine_num=15, seed=None):
+        self.reset(rows, cols, mine_num, seed)
+
+    def reset(self, rows, cols, mine_num, seed=None):
+        """开始新的一局；每局使用独立的随机数生成器，不给 seed 时随机生成一个并记录下来，保证可复现"""
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.moves = []  # 操作记录 [(距开局的毫秒数, 操作, x, y)]，操作为 "o" 打开、"f" 插旗、"c" 双键
+        self.start_time = time.perf_counter()
+        self.rows = rows
+        self.cols = cols
+        self.mine_num = max(0, min(mine_num, rows * cols - 1))
+        self.is_first_click = True
+        self.mines_at_reset = False  # 是否在首次点击前布雷（训练环境），回放时需要同样处理
+        self.game_over = False
+        self.win = False
+        self.exploded = None  # 踩中的雷的位置
+        self.version = 0  # 每次有效操作加一，用于判断外部缓存是否过期
+
+        # 计数器：每次打开/插旗时增量更新，胜负判断和剩余雷数都是 O(1)
+        self.safe_remaining = rows * cols - self.mine_num  # 尚未打开的安全格数量
+        self.flag_count = 0
+
+        # 棋盘状态（紧凑的 NumPy 数组）
+        self.mines = np.zeros((rows, cols), dtype=bool)
+        self.numbers = np.zeros((rows, cols), dtype=np.int8)
+        self.flags = np.zeros((rows, cols), dtype=bool)
+        self.revealed = np.zeros((rows, cols), dtype=bool)
+        # 邻格位掩码（每格 1 字节）：unknown_bits 的第 k 位表示第 k 个邻格未打开且未插旗，flag_bits 表示已插旗。
+        # 打开和插旗时只更新变化格子周围的掩码，推理器不必逐个检查邻格
+        self.unknown_bits = neighbor_bits(np.ones((rows, cols), dtype=bool))
+        self.flag_bits = np.zeros((rows, cols), dtype=np.uint8)
+
+    def neighbors(self, x, y):
+        """返回 (x, y) 周围 8 个格子中在棋盘内的位置"""
+        return [(x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                if (dx, dy) != (0, 0) and 0 <= x + dx < self.rows and 0 <= y + dy < self.cols]
+
+    def generate_mines(self, safe_x=None, safe_y=None):
+        """布雷；给定 (safe_x, safe_y) 时保证该格及其周围尽量无雷"""
+        total = self.rows * self.cols
+
+        self.mines_at_reset = safe_x is None
+        # 安全区的一维下标（最多 9 个，升序）
+        safe_area = []
+        if safe_x is not None:
+            safe_area = sorted(nx * self.cols + ny
+                               for nx, ny in self.neighbors(safe_x, safe_y) + [(safe_x, safe_y)])
+
+        # 按下标在非安全区中抽样：先在 [0, total - len(safe_area)) 中抽，再跳过安全区下标
+        mine_count = min(self.mine_num, total - len(safe_area))
+        if total > LARGE_BOARD_CELLS:
+            np_rng = np.random.default_rng(self.rng.getrandbits(64))
+            mine_positions = np_rng.choice(total - len(safe_area), mine_count, replace=False).astype(np.int64)
+        else:
+            mine_positions = np.array(self.rng.sample(range(total - len(safe_area)), mine_count), dtype=np.int64)
+        for index in safe_area:
+            mine_positions[mine_positions >= index] += 1
+
+        # If we still need more mines, add from safe area (excluding first click)
+        if mine_count < self.mine_num:
+            remaining = self.mine_num - mine_count
+            extra_positions = [index for index in safe_area if index != safe_x * self.cols + safe_y]
+            extra = self.rng.sample(extra_positions, min(remaining, len(extra_positions)))
+            mine_positions = np.concatenate([mine_positions, np.array(extra, dtype=np.int64)])
+
+        # Place mines
+        self.mines.fill(False)
+        self.mines.flat[mine_positions] = True
+        self.numbers = count_neighbor_mines(self.mines)
+
+        self.is_first_click = False
+
+    def open_cell(self, x, y):
+        """左键打开格子；返回新打开的格子列表，操作无效时返回 None"""
+        if self.game_over or self.flags[x, y] or self.revealed[x, y]:
+            return None
+
+        if self.is_first_click:
+            self.generate_mines(x, y)
+
+        self.record_move("o", x, y)
+        if self.mines[x, y]:
+            self.exploded = (x, y)
+            self.game_over = True
+            return []
+
+        changed = self.reveal(x, y)
+
+        if self.check_win():
+            self.game_over = True
+            self.win = True
+        return changed
+
+    def toggle_flag(self, x, y):
+        """右键插旗/取消插旗；返回 False 表示操作无效"""
+        if self.game_over or self.revealed[x, y]:
+            return False
+        self.record_move("f", x, y)
+        self.flags[x, y] = not self.flags[x, y]
+        self.flag_count += 1 if self.flags[x, y] else -1
+        self.update_bits(x, y)
+        return True
+
+    def chord(self, x, y):
+        """双键点击：周围旗数等于数字时打开其余邻格；返回新打开的格子列表，操作无效时返回 None"""
+        if self.game_over or not self.revealed[x, y]:
+            return None
+
+        neighbors = self.neighbors(x, y)
+        flag_count = sum(self.flags[nx, ny] for nx, ny in neighbors)
+        if flag_count != self.numbers[x, y]:
+            return None
+
+        self.record_move("c", x, y)
+        changed = []
+        for nx, ny in neighbors:
+            if not self.revealed[nx, ny] and not self.flags[nx, ny]:
+                if self.mines[nx, ny]:
+                    self.exploded = (nx, ny)
+                    self.game_over = True
+                    return changed
+                changed += self.reveal(nx, ny)
+
+        if self.check_win():
+            self.game_over = True
+            self.win = True
+        return changed
+
+    def record_move(self, action, x, y):
+        """记录一次有效操作（用于回放）并更新版本号"""
+        self.version += 1
+        self.moves.append((int((time.perf_counter() - self.start_time) * 1000), action, int(x), int(y)))
+
+    def apply_moves(self, opens=(), flags=()):
+        """在一次事务中执行一批插旗和打开（只插旗、不取消插旗），返回 (变化的格子, 有效操作数)"""
+        changed = []
+        moves = 0
+        for x, y in flags:
+            if not self.flags[x, y] and self.toggle_flag(x, y):
+                changed.append((x, y))
+                moves += 1
+        for x, y in opens:
+            if self.game_over:
+                break
+            result = self.open_cell(x, y)
+            if result is not None:
+                changed += result
+                moves += 1
+        return changed, moves
+
+    def reveal(self, x, y):
+        """洪水填充：每轮用数组运算整体扩展一层边界，返回本次新打开的格子列表"""
+        if self.revealed[x, y] or self.flags[x, y]:
+            return []
+
+        self.revealed[x, y] = True
+        if self.numbers[x, y] != 0:
+            self.safe_remaining -= 1
+            self.update_bits(x, y)
+            return [(x, y)]
+
+        # 在一维视图上操作，避免逐格访问 NumPy 数组
+        revealed = self.revealed.reshape(-1)
+        flags = self.flags.reshape(-1)
+        numbers = self.numbers.reshape(-1)
+
+        frontier = np.array([x * self.cols + y], dtype=np.int64)
+        layers = [frontier]
+        while frontier.size:
+            fx, fy = np.divmod(frontier, self.cols)
+            nx = (fx[:, None] + NEIGHBOR_DX).reshape(-1)
+            ny = (fy[:, None] + NEIGHBOR_DY).reshape(-1)
+            inside = (nx >= 0) & (nx < self.rows) & (ny >= 0) & (ny < self.cols)
+            candidates = nx[inside] * self.cols + ny[inside]
+            candidates = np.sort(candidates[~revealed[candidates] & ~flags[candidates]])
+            if candidates.size:  # 同一格可能被相邻的多个边界格扩展到，排序后去重
+                candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+            revealed[candidates] = True
+            layers.append(candidates)
+            frontier = candidates[numbers[candidates] == 0]
+
+        changed = np.concatenate(layers)
+        self.safe_remaining -= changed.size
+        changed_x, changed_y = np.divmod(changed, self.cols)
+        self.update_bits_many(changed_x, changed_y)
+        return list(zip(changed_x.tolist(), changed_y.tolist()))
+
+    def update_bits(self, x, y):
+        """(x, y) 被打开或插旗/取消插旗后，更新周围 8 格的位掩码中对应这一格的位"""
+        unknown = not self.revealed[x, y] and not self.flags[x, y]
+        flagged = bool(self.flags[x, y])
+        for k, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.rows and 0 <= ny < self.cols:
+                bit = 1 << (7 - k)
+                unknown_bits = int(self.unknown_bits[nx, ny])
+                flag_bits = int(self.flag_bits[nx, ny])
+                self.unknown_bits[nx, ny] = unknown_bits | bit if unknown else unknown_bits & ~bit
+                self.flag_bits[nx, ny] = flag_bits | bit if flagged else flag_bits & ~bit
+
+    def update_bits_many(self, xs, ys):
+        """update_bits 的批量版本（xs, ys 为下标数组），用于大片展开"""
+        unknown = ~self.revealed[xs, ys] & ~self.flags[xs, ys]
+        flagged = self.flags[xs, ys]
+        for k, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+            nx, ny = xs + dx, ys + dy
+            inside = (nx >= 0) & (nx < self.rows) & (ny >= 0) & (ny < self.cols)
+            nx, ny = nx[inside], ny[inside]
+            bit = np.uint8(1 << (7 - k))
+            keep = np.uint8(255) ^ bit
+            # 同一个 k 下不同格子的邻格互不相同（重复的格子写入的值也相同），可以直接按下标赋值
+            self.unknown_bits[nx, ny] = (self.unknown_bits[nx, ny] & keep) | unknown[inside] * bit
+            self.flag_bits[nx, ny] = (self.flag_bits[nx, ny] & keep) | flagged[inside] * bit
+
+    def check_win(self):
+        return self.exploded is None and self.safe_remaining == 0
+
+    def get_unopened_unflagged_neighbors(self, x, y):
+        """(x, y) 周围未打开且未插旗的格子集合和插旗的邻格数，直接由邻格位掩码得到"""
+        unopened_unflagged = {(x + dx, y + dy) for dx, dy in NEIGHBOR_MASK_OFFSETS[self.unknown_bits[x, y]]}
+        return unopened_unflagged, int(self.flag_bits[x, y]).bit_count()
+
+    def get_remaining_mines(self):
+        return self.mine_num - self.flag_count
+
+    def snapshot(self):
+        return BoardSnapshot(self)
+
+    def snapshot_delta(self, cells):
+        """cells 这些格子的可见状态，用 BoardSnapshot.apply 更新已有的快照，代价只与格子数有关"""
+        return BoardDelta(self, cells)
+
+class BoardSnapshot:
+    """棋盘的快照：只包含玩家可见的信息（不含雷的位置），可以交给后台线程推理
+
+    提供推理器用到的那部分引擎接口；之后引擎上的操作不会影响快照，
+    需要时用 apply() 只把变化的格子同步过来，大棋盘上不必每一步都复制整个棋盘。
+    """
+
+    def __init__(self, engine):
+        self.rows = engine.rows
+        self.cols = engine.cols
+        self.mine_num = engine.mine_num
+        self.flag_count = engine.flag_count
+        self.safe_remaining = engine.safe_remaining
+        self.version = engine.version
+        self.revealed = engine.revealed.copy()
+        self.flags = engine.flags.copy()
+        self.numbers = np.where(self.revealed, engine.numbers, 0).astype(np.int8)
+        self.unknown_bits = engine.unknown_bits.copy()
+        self.flag_bits = engine.flag_bits.copy()
+
+    def apply(self, delta):
+        self.revealed[delta.xs, delta.ys] = delta.revealed
+        self.flags[delta.xs, delta.ys] = delta.flags
+        self.numbers[delta.xs, delta.ys] = delta.numbers
+        self.update_bits_many(delta.xs, delta.ys)
+        self.flag_count = delta.flag_count
+        self.safe_remaining = delta.safe_remaining
+        self.version = delta.version
+
+    neighbors = MineSweeperEngine.neighbors
+    get_unopened_unflagged_neighbors = MineSweeperEngine.get_unopened_unflagged_neighbors
+    update_bits_many = MineSweeperEngine.update_bits_many
+    get_remaining_mines = MineSweeperEngine.get_remaining_mines
+
+class BoardDelta:
+    """一批格子的可见状态和引擎计数器，由 engine.snapshot_delta() 生成"""
+
+    def __init__(self, engine, cells):
+        self.xs, self.ys = np.array(cells, dtype=np.int64).reshape(-1, 2).T
+        self.revealed = engine.revealed[self.xs, self.ys]
+        self.flags = engine.flags[self.xs, self.ys]
+        self.numbers = np.where(self.revealed, engine.numbers[self.xs, self.ys], 0)
+        self.flag_count = engine.flag_count
+        self.safe_remaining = engine.safe_remaining
+        self.version = engine.version
+
+if __name__ == "__main__":
+    print("这是扫雷的无界面规则引擎")
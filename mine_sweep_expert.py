@@ -0,0 +1,191 @@
+# mine_sweep_expert.py
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+import numpy as np
+from mine_sweep_engine import MineSweeperEngine
+from mine_sweep_benchmark import play_logical_game
+from mine_sweep_observation import OBS_SIZE, OUTSIDE, ObservationBuffer, action_masks, random_board_config
+
+# 专家动作编码（与观测同形状的 int8 数组）：0 不是专家动作，1 打开，2 插旗
+EXPERT_OPEN = 1
+EXPERT_FLAG = 2
+
+CHUNK_SIZE = 4096  # 每个数据块的样本数
+MANIFEST = "manifest.json"
+
+class ChunkWriter:
+    """把样本攒满一块后写成 .npy 文件，读取时可以直接内存映射"""
+
+    def __init__(self, directory, prefix, chunk_size=CHUNK_SIZE, obs_size=OBS_SIZE):
+        self.directory = directory
+        self.prefix = prefix
+        self.obs = np.empty((chunk_size, obs_size, obs_size), dtype=np.int8)
+        self.targets = np.empty((chunk_size, obs_size, obs_size), dtype=np.int8)
+        self.size = 0
+        self.chunks = []  # [(文件名前缀, 样本数)]
+
+    def add(self, obs, targets):
+        self.obs[self.size] = obs
+        self.targets[self.size] = targets
+        self.size += 1
+        if self.size == len(self.obs):
+            self.flush()
+
+    def flush(self):
+        if not self.size:
+            return
+        name = f"{self.prefix}_{len(self.chunks):05d}"
+        np.save(os.path.join(self.directory, name + ".obs.npy"), self.obs[:self.size])
+        np.save(os.path.join(self.directory, name + ".act.npy"), self.targets[:self.size])
+        self.chunks.append((name, self.size))
+        self.size = 0
+
+def record_games(task):
+    """在工作进程中用逻辑AI玩一批种子固定的棋盘，把每次决策前的观测和专家动作写入数据块"""
+    first_seed, games, directory, chunk_size, guess, obs_size = task
+    writer = ChunkWriter(directory, f"seed{first_seed:010d}", chunk_size, obs_size)
+    wins = 0
+    for seed in range(first_seed, first_seed + games):
+        rng = random.Random(seed)
+        engine = MineSweeperEngine(*random_board_config(rng, obs_size), seed=seed)
+        observation = ObservationBuffer(engine, obs_size)
+        observation.rebuild()
+        decisions = []
+
+        def on_decision(opens, flags, changed):
+            # 回调在这一批操作执行之后调用，此时缓冲区还是执行之前的观测
+            if decisions:  # 第一次是随机的首次点击，不作为专家样本
+                targets = np.zeros((obs_size, obs_size), dtype=np.int8)
+                for x, y in flags:
+                    targets[x, y] = EXPERT_FLAG
+                for x, y in opens:
+                    targets[x, y] = EXPERT_OPEN
+                writer.add(observation.view, targets)
+            decisions.append(len(opens) + len(flags))
+            observation.rebuild()
+
+        play_logical_game(engine, guess, random.Random(f"ai-{seed}-0"), on_decision)
+        wins += engine.win
+    writer.flush()
+    return writer.chunks, games, wins
+
+def generate(directory, games, seed=0, processes=None, chunk_size=CHUNK_SIZE, guess=True, games_per_task=50,
+             obs_size=OBS_SIZE):
+    """多进程生成专家数据集，返回清单（数据块列表、观测大小和统计）"""
+    os.makedirs(directory, exist_ok=True)
+    tasks = [(first, min(games_per_task, seed + games - first), directory, chunk_size, guess, obs_size)
+             for first in range(seed, seed + games, games_per_task)]
+    chunks = []
+    total_games = total_wins = 0
+    with multiprocessing.Pool(processes) as pool:
+        for task_chunks, task_games, task_wins in pool.imap_unordered(record_games, tasks):
+            chunks += task_chunks
+            total_games += task_games
+            total_wins += task_wins
+
+    manifest = {"chunks": sorted(chunks), "obs_size": obs_size, "games": total_games, "wins": total_wins,
+                "samples": sum(size for _, size in chunks)}
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+class ExpertDataset:
+    """以内存映射方式读取分块的专家数据集"""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.obs_size = self.manifest.get("obs_size", OBS_SIZE)  # 较早的数据集没有记录，固定为 50x50
+        self.chunks = [(np.load(os.path.join(directory, name + ".obs.npy"), mmap_mode="r"),
+                        np.load(os.path.join(directory, name + ".act.npy"), mmap_mode="r"))
+                       for name, _ in self.manifest["chunks"]]
+
+    def __len__(self):
+        return self.manifest["samples"]
+
+    def batches(self, batch_size, rng, size=None):
+        """按随机顺序逐块读入内存并在块内打乱，避免对内存映射文件做完全随机的访问
+
+        size 大于数据集的观测大小时，在右侧和下方补上地图外的格子（棋盘都在左上角）。
+        """
+        pad = 0 if size is None else size - self.obs_size
+        for chunk in rng.permutation(len(self.chunks)):
+            obs, targets = self.chunks[chunk]
+            order = rng.permutation(len(obs))
+            obs, targets = np.asarray(obs)[order], np.asarray(targets)[order]
+            if pad:
+                obs = np.pad(obs, ((0, 0), (0, pad), (0, pad)), constant_values=OUTSIDE)
+                targets = np.pad(targets, ((0, 0), (0, pad), (0, pad)))
+            for start in range(0, len(obs), batch_size):
+                yield obs[start:start + batch_size], targets[start:start + batch_size]
+
+def expert_distribution(targets):
+    """专家动作集合上的均匀分布 (N, 2 * size²)，下标与动作编码一致"""
+    flat = targets.reshape(len(targets), -1)
+    labels = np.concatenate([flat == EXPERT_OPEN, flat == EXPERT_FLAG], axis=1).astype(np.float32)
+    return labels / labels.sum(axis=1, keepdims=True)
+
+def pretrain(model, dataset, epochs=1, batch_size=256, learning_rate=3e-4, seed=0, log=print):
+    """行为克隆：最小化策略在合法动作上的分布与专家动作集合之间的交叉熵，用来初始化 PPO 策略
+
+    观测比模型小的数据集补齐后使用，比模型大时直接抛出 ValueError。
+    """
+    import torch
+
+    size = model.observation_space.shape[-1]
+    if dataset.obs_size > size:
+        raise ValueError(f"专家数据的观测 {dataset.obs_size}x{dataset.obs_size} 大于模型的观测 {size}x{size}，"
+                         f"请用 --obs-size {size} 重新生成")
+    policy = model.policy
+    policy.set_training_mode(True)
+    optimizer = torch.optim.Adam(policy.parameters(), lr=learning_rate)
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        total_loss = total_hits = total_samples = 0
+        for obs, targets in dataset.batches(batch_size, rng, size):
+            obs_tensor = torch.as_tensor(obs, device=policy.device).float()
+            legal = torch.as_tensor(action_masks(obs), device=policy.device)
+            expert = torch.as_tensor(expert_distribution(targets), device=policy.device)
+
+            logits = policy.get_distribution(obs_tensor).distribution.logits
+            log_probs = torch.log_softmax(logits.masked_fill(~legal, -1e8), dim=1)
+            loss = -(expert * log_probs).sum(dim=1).mean()
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+
+            total_loss += loss.item() * len(obs)
+            total_hits += (expert.gather(1, log_probs.argmax(dim=1, keepdim=True)) > 0).sum().item()
+            total_samples += len(obs)
+        log(f"行为克隆 第 {epoch + 1}/{epochs} 轮  loss={total_loss / total_samples:.4f}  "
+            f"专家动作命中率={total_hits / total_samples:.3f}  用时 {time.perf_counter() - start:.1f} 秒")
+    policy.set_training_mode(False)
+    return model
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用逻辑AI生成专家数据集（观测, 专家动作），用于行为克隆预训练")
+    parser.add_argument("--out", default="expert_data", help="输出目录")
+    parser.add_argument("--games", type=int, default=10000, help="对局数")
+    parser.add_argument("--seed", type=int, default=0, help="第一局的随机种子，之后依次加一")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="进程数")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="每个数据块的样本数")
+    parser.add_argument("--no-guess", action="store_true", help="无法推理时不做概率猜测，直接结束该局")
+    parser.add_argument("--obs-size", type=int, default=OBS_SIZE,
+                        help="观测边长，与训练时的 --obs-size 一致（随机棋盘的边长不超过它）")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    manifest = generate(args.out, args.games, args.seed, args.processes, args.chunk_size, not args.no_guess,
+                        obs_size=args.obs_size)
+    print(f"{manifest['games']} 局（胜 {manifest['wins']}），{manifest['samples']} 个样本，"
+          f"{len(manifest['chunks'])} 个数据块，用时 {time.perf_counter() - start:.1f} 秒")
+    return manifest
+
+if __name__ == "__main__":
+    main()
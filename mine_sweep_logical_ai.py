@@ -1,194 +1,212 @@
-# mine_sweep_logical_ai.py
-import random
-from PyQt5.QtWidgets import QMessageBox 
-from PyQt5.QtCore import QTimer
-
-class MineSweeperLogicalAI:
-    def __init__(self, game):
-        self.game = game
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.perform_ai_step)
-        self.is_active = False
-        self.probability_guess_on = False
-        self.ai_stop_callback = None
-
-        self.to_open = []
-        self.to_flag = []
-
-        self.danger_zone = set()  # 用于存储“危险区”格子
-
-    def start_ai(self):
-        self.is_active = True
-        self.update_danger_zone()
-        self.timer.start(100)  # 每 0.1 秒执行一次
-    
-    def stop_ai(self):
-        self.is_active = False
-        self.timer.stop()
-        self.to_open = []
-        self.to_flag = []
-        self.danger_zone.clear()
-
-    def perform_ai_step(self):
-        if self.game.is_first_click:
-            self.game.handle_left_click(random.randint(0, self.game.rows - 1), random.randint(0, self.game.cols - 1))
-            self.update_danger_zone()
-            return
-
-        if self.game.game_over:
-            self.stop_ai()
-            return
-
-        # **优先执行存储的操作**
-        while self.to_flag:
-            x, y = self.to_flag.pop(0)
-            if not self.game.buttons[x][y].is_flag:
-                self.game.handle_right_click(x, y)
-                self.update_danger_zone()
-                return  
-            else:
-                continue  
-
-        while self.to_open:
-            x, y = self.to_open.pop(0)
-            if not self.game.buttons[x][y].is_revealed:
-                self.game.handle_left_click(x, y)
-                self.update_danger_zone()
-                return  
-            else:
-                continue  
-
-        # **如果执行存储的操作时全是重复的，则立即执行一次新的推理**
-        self.infer_logic()
-
-        # **如果 infer_logic 发现新的 to_open/to_flag，则立即执行一次 perform_ai_step**
-        if self.to_open or self.to_flag:
-            self.perform_ai_step()
-        elif self.probability_guess_on:
-            self.probability_guess()
-        else:
-            self.ai_stop_callback()
-            QMessageBox.information(self.game, "AI Stop", "Could not find any completely safe cells!")
-
-    def infer_logic(self):
-        """推理逻辑，计算 to_open 和 to_flag，仅遍历危险区"""
-        number_cells = list(self.danger_zone)  # 只遍历危险区中的数字格
-
-        for (x, y) in number_cells:
-            unopened, flagged = self.game.get_unopened_unflagged_neighbors(x, y)
-            mines_num = self.game.buttons[x][y].number
-
-            if len(unopened) == mines_num - flagged:
-                self.to_flag.extend(unopened)
-            if flagged == mines_num:
-                self.to_open.extend(unopened)
-
-        # **二格推理**
-        for (x1, y1) in number_cells:
-            U_A, flagged_A = self.game.get_unopened_unflagged_neighbors(x1, y1)
-            num_A = self.game.buttons[x1][y1].number
-            remaining_A = num_A - flagged_A
-
-            for (x2, y2) in number_cells:
-                if (x1, y1) == (x2, y2):
-                    continue
-
-                U_B, flagged_B = self.game.get_unopened_unflagged_neighbors(x2, y2)
-                num_B = self.game.buttons[x2][y2].number
-                remaining_B = num_B - flagged_B
-
-                if U_A.issubset(U_B) and len(U_A) < len(U_B):
-                    diff = list(U_B - U_A)
-                    if remaining_A == remaining_B:
-                        self.to_open.extend(diff)
-                    elif remaining_B - remaining_A == len(diff):
-                        self.to_flag.extend(diff)
-
-                if U_B.issubset(U_A) and len(U_B) < len(U_A):
-                    diff = list(U_A - U_B)
-                    if remaining_B == remaining_A:
-                        self.to_open.extend(diff)
-                    elif remaining_A - remaining_B == len(diff):
-                        self.to_flag.extend(diff)
-
-        # **2-1 推理**
-        for (x1, y1) in number_cells:
-            for (x2, y2) in number_cells:
-                if (x1, y1) == (x2, y2):
-                    continue
-                if abs(x1 - x2) > 1 or abs(y1 - y2) > 1:
-                    continue
-
-                num_A = self.game.buttons[x1][y1].number
-                num_B = self.game.buttons[x2][y2].number
-
-                U_A, flagged_A = self.game.get_unopened_unflagged_neighbors(x1, y1)
-                U_B, flagged_B = self.game.get_unopened_unflagged_neighbors(x2, y2)
-
-                remaining_A = num_A - flagged_A
-                remaining_B = num_B - flagged_B
-
-                common = U_A & U_B
-                diff_A = list(U_A - U_B)
-                diff_B = list(U_B - U_A)
-
-                if len(common) == 2 and len(diff_A) == 1 and len(diff_B) == 1 and (remaining_A - remaining_B) == 1:
-                    self.to_flag.extend(diff_A)
-                    self.to_open.extend(diff_B)
-
-    def update_danger_zone(self):
-        """更新危险区：只包含未打开格子的邻居"""
-        self.danger_zone.clear()
-        for x in range(self.game.rows):
-            for y in range(self.game.cols):
-                if self.game.buttons[x][y].is_revealed and self.game.buttons[x][y].number > 0:
-                    self.danger_zone.add((x, y))
-
-    def probability_guess(self):
-        """全局概率推测法：基于所有未开格子的多个数字格信息，选择概率最低的进行打开"""
-        probability_map = {}  # 记录每个未开格的最小雷概率
-
-        # **遍历所有未打开、未插旗的格子**
-        for x in range(self.game.rows):
-            for y in range(self.game.cols):
-                button = self.game.buttons[x][y]
-                if button.is_revealed or button.is_flag:
-                    continue  # 只考虑未开且未插旗的格子
-
-                surrounding_numbers = []  # 存放影响该格子的数字格
-
-                # 找到所有影响该格子的数字格
-                for dx in [-1, 0, 1]:
-                    for dy in [-1, 0, 1]:
-                        nx, ny = x + dx, y + dy
-                        if 0 <= nx < self.game.rows and 0 <= ny < self.game.cols:
-                            neighbor = self.game.buttons[nx][ny]
-                            if neighbor.is_revealed and neighbor.number > 0:
-                                surrounding_numbers.append((nx, ny))
-
-                if not surrounding_numbers:
-                    continue  # 该格子没有任何已知信息，跳过
-
-                # 计算该格子的最坏概率
-                min_prob = 1.0  # 初始设为最大概率
-                for (nx, ny) in surrounding_numbers:
-                    unopened, flagged = self.game.get_unopened_unflagged_neighbors(nx, ny)
-                    remaining_mines = self.game.buttons[nx][ny].number - flagged
-                    local_prob = remaining_mines / len(unopened) if unopened else 1.0  # 避免除零错误
-
-                    # 取最大概率（保守策略）
-                    min_prob = min(min_prob, local_prob)
-
-                probability_map[(x, y)] = min_prob
-
-        # **找到最小概率的格子**
-        if probability_map:
-            min_probability = min(probability_map.values())
-            best_cells = [pos for pos, prob in probability_map.items() if prob == min_probability]
-
-            # **随机选择一个最安全的格子进行打开**
-            x, y = random.choice(best_cells)
-            self.game.handle_left_click(x, y)
-
-if __name__ == "__main__":
+# mine_sweep_logical_ai.py
+import random
+import time
+import traceback
+from functools import partial
+from itertools import islice
+from PyQt5.QtWidgets import QMessageBox 
+from PyQt5.QtCore import QTimer
+from mine_sweep_ai_worker import AIWorker
+from mine_sweep_engine import BoardSnapshot
+from mine_sweep_profiler import Profiler
+from mine_sweep_solver import MineSweeperSolver
+
+TURBO_BATCH_SIZE = 1000  # 极速模式每个 tick 最多执行的操作数，大棋盘上一次推出上万个格子时界面也能及时刷新
+
+class MineSweeperLogicalAI:
+    def __init__(self, game):
+        self.game = game
+        self.engine = game.engine  # 直接读取引擎中的棋盘状态
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.perform_ai_step)
+        self.is_active = False
+        self.probability_guess_on = False
+        self.turbo_on = False
+        self.ai_stop_callback = None
+
+        # 待执行的操作，用 dict 当作有序集合去重
+        self.to_open = {}
+        self.to_flag = {}
+
+        # 推理在后台线程中进行：solver 只在 worker 线程中使用，界面线程只提交棋盘快照和执行结果
+        self.profiler = Profiler()  # 分阶段计时，默认关闭，界面上可以打开
+        self.solver = MineSweeperSolver(self.engine, profiler=self.profiler)  # 维护“危险区”（约束边界）并做推理
+        self.worker = AIWorker()
+        self.session = 0  # 每次启动/停止加一，旧会话的推理结果直接丢弃
+        self.inferring = False  # 是否有推理正在后台进行
+        self.changed = None  # 上次提交推理后 AI 自己改变的格子，None 表示需要整体重建边界
+        self.moves = 0
+        self.sent_version = None  # 最近一次交给后台的棋盘版本
+        self.board = None  # 后台线程持有的棋盘快照，之后只同步变化的格子
+        self.rng = random.Random()
+
+    def start_ai(self):
+        self.is_active = True
+        self.session += 1
+        # AI 的随机选择（首次点击、猜测时打平）使用由本局种子派生的独立随机数，同一局可复现
+        self.rng = random.Random(f"ai-{self.engine.seed}-{self.engine.version}")
+        self.changed = None
+        self.timer.start(self.interval())
+
+    def stop_ai(self):
+        self.is_active = False
+        self.session += 1
+        self.timer.stop()
+        self.to_open.clear()
+        self.to_flag.clear()
+        self.changed = None
+
+    def interval(self):
+        return 0 if self.turbo_on else 100  # 普通模式每 0.1 秒执行一次，极速模式空闲时立即执行
+
+    def set_turbo(self, on):
+        self.turbo_on = on
+        if self.is_active:
+            self.timer.setInterval(self.interval())
+
+    def perform_ai_step(self):
+        if self.inferring:
+            return
+
+        if self.game.is_first_click:
+            changed = self.game.handle_left_click(self.rng.randint(0, self.game.rows - 1), self.rng.randint(0, self.game.cols - 1))
+            self.update_danger_zone(changed)
+            return
+
+        if self.game.game_over:
+            self.stop_ai()
+            return
+
+        # **优先执行存储的操作；全是重复的时提交一次新的推理**
+        executed = self.execute_batch() if self.turbo_on else self.execute_stored()
+        if not executed:
+            self.request_inference()
+
+    def execute_stored(self):
+        """执行一个存储的操作（插旗优先），返回是否执行了操作"""
+        while self.to_flag:
+            x, y = next(iter(self.to_flag))
+            del self.to_flag[(x, y)]
+            if not self.engine.flags[x, y]:
+                self.game.handle_right_click(x, y)
+                self.update_danger_zone([(x, y)])
+                return True
+
+        while self.to_open:
+            x, y = next(iter(self.to_open))
+            del self.to_open[(x, y)]
+            if not self.engine.revealed[x, y]:
+                changed = self.game.handle_left_click(x, y)
+                self.update_danger_zone(changed)
+                return True
+        return False
+
+    def execute_batch(self):
+        """极速模式：把存储的插旗和打开作为一批交给引擎执行，返回是否还有存储的操作"""
+        if not self.to_open and not self.to_flag:
+            return False
+        flags = list(islice(self.to_flag, TURBO_BATCH_SIZE))
+        opens = list(islice(self.to_open, TURBO_BATCH_SIZE - len(flags)))
+        for cell in flags:
+            del self.to_flag[cell]
+        for cell in opens:
+            del self.to_open[cell]
+        changed, moves = self.game.apply_moves(opens, flags)
+        self.update_danger_zone(changed, moves)
+        return True
+
+    def request_inference(self):
+        """把上次推理以来的变化交给后台线程；推理期间暂停计时器
+
+        只有 AI 自己的操作时只发送变化格子的状态，后台快照原地更新；
+        有手动操作（版本号对不上）或需要重建时才复制整个棋盘。
+        """
+        changed, moves = self.changed, self.moves
+        if changed is None or self.engine.version != self.sent_version + moves:
+            snapshot, changed = self.engine.snapshot(), None
+        else:
+            snapshot = self.engine.snapshot_delta(changed)
+        self.sent_version = self.engine.version
+        self.changed, self.moves = [], 0
+        self.inferring = True
+        self.timer.stop()
+        self.worker.submit(self.infer_logic, snapshot, changed, moves, self.probability_guess_on, self.rng,
+                           callback=partial(self.on_inference, self.session, snapshot.version, time.perf_counter()))
+
+    def on_inference(self, session, version, submitted, result, error):
+        """在界面线程中处理推理结果；AI 已停止或棋盘在推理期间被改动过时结果作废，推理出错时停止 AI 并提示"""
+        self.inferring = False
+        self.profiler.add("latency_ms", (time.perf_counter() - submitted) * 1000)  # 提交到结果回到界面线程
+        if error is not None:
+            self.profiler.end_step()
+            if self.is_active:
+                self.report_error(error)
+            return
+        if session != self.session or not self.is_active:
+            return
+        if self.engine.version != version:  # 期间有手动操作，重新推理（边界会整体重建）
+            self.changed = None
+            self.timer.start(self.interval())
+            return
+
+        to_open, to_flag, guess = result
+        if not to_open and not to_flag and guess is None:
+            self.profiler.end_step()
+            self.report_stuck()
+            return
+
+        with self.profiler.phase("apply"):
+            if guess is not None:
+                x, y = guess
+                changed = self.game.handle_left_click(x, y)
+                self.update_danger_zone(changed)
+            else:
+                self.to_open.update(dict.fromkeys(to_open))
+                self.to_flag.update(dict.fromkeys(to_flag))
+                if self.turbo_on:
+                    self.execute_batch()
+                else:
+                    self.execute_stored()
+        self.profiler.end_step()
+        self.timer.start(self.interval())
+
+    def report_stuck(self):
+        self.ai_stop_callback()
+        QMessageBox.information(self.game, "AI Stop", "Could not find any completely safe cells!")
+
+    def report_error(self, error):
+        traceback.print_exception(error)
+        self.ai_stop_callback()
+        QMessageBox.warning(self.game, "AI Error", f"Logical AI stopped because inference failed:\n{error!r}")
+
+    def update_danger_zone(self, changed, moves=1):
+        """记录 AI 自己造成的变化，下次推理时危险区（约束边界）只在这些格子附近增量更新"""
+        if self.changed is not None:
+            self.changed += changed
+            self.moves += moves
+
+    def infer_logic(self, snapshot, changed, moves, guess, rng):
+        """在后台线程中运行：同步快照和边界后推理，返回 (to_open, to_flag, 猜测的格子)
+
+        推不出确定的操作且开启了概率推测时，精确计算每个未知格（含边界外的内部格子）的雷概率，
+        猜测概率最低的格子。
+        """
+        profiler = self.profiler
+        if isinstance(snapshot, BoardSnapshot):
+            self.board = snapshot
+        else:
+            self.board.apply(snapshot)
+        self.solver.engine = self.board
+        with profiler.phase("sync"):
+            self.solver.sync(changed, moves)
+        with profiler.phase("infer"):
+            to_open, to_flag = self.solver.infer()
+        cell = None
+        if not to_open and not to_flag and guess:
+            with profiler.phase("guess"):
+                cell = self.solver.best_guess(rng)
+            profiler.add("guesses", cell is not None)
+        return list(dict.fromkeys(to_open)), list(dict.fromkeys(to_flag)), cell
+
+if __name__ == "__main__":
     print("这是扫雷的逻辑AI")
\ No newline at end of file
@@ -0,0 +1,139 @@
+# mine_sweep_observation.py
+import inspect
+import random
+import numpy as np
+
+OBS_SIZE = 50  # 默认观测为 50x50，小地图放在左上角；训练环境可以指定更大的观测
+
+# 观测编码：-3 地图外，-2 未打开，-1 插旗，0~8 已打开格子的数字
+OUTSIDE = -3
+UNKNOWN = -2
+FLAG = -1
+
+def random_board_config(rng=random, max_size=OBS_SIZE, rows=None, cols=None, mines=None):
+    """随机生成地图尺寸和雷的数量（训练时的棋盘分布），边长不超过 max_size
+
+    rows、cols、mines 中给定的值保持不变，只随机其余的；雷数按确定后的实际尺寸抽取。
+    """
+    if rows is None:
+        rows = rng.randint(min(10, max_size), max_size)
+    if cols is None:
+        cols = rng.randint(min(10, max_size), max_size)
+    if mines is None:
+        mines = rng.randint(int(rows * cols * 0.05), int(rows * cols * 0.2))
+    return rows, cols, mines
+
+# 动作编码：一维下标 action_type * size² + x * size + y（默认 size 为 50），action_type 0 为打开、1 为插旗
+def encode_action(x, y, action_type, size=OBS_SIZE):
+    return action_type * size * size + x * size + y
+
+def decode_action(action, size=OBS_SIZE):
+    """一维动作下标 -> (x, y, action_type)，也可以对整个数组批量解码"""
+    action_type, cell = divmod(action, size * size)
+    x, y = divmod(cell, size)
+    return x, y, action_type
+
+def action_masks(obs):
+    """由观测得到合法动作掩码：只有地图内未打开且未插旗的格子可以打开或插旗；支持 (..., size, size) 批量输入"""
+    legal = (obs == UNKNOWN).reshape(*obs.shape[:-2], -1)
+    return np.concatenate([legal, legal], axis=-1)
+
+def check_spaces(observation_space, action_space):
+    """检查模型是否使用当前的编码：size x size 的观测和 Discrete(2 * size²) 的动作
+
+    旧版模型的动作空间是 MultiDiscrete([50, 50, 2])，可以加载但推理时会出错，需要重新训练。
+    """
+    from gymnasium import spaces
+    shape = observation_space.shape
+    if len(shape) != 2 or shape[0] != shape[1]:
+        raise ValueError(f"模型的观测形状 {shape} 不是正方形棋盘")
+    if not isinstance(action_space, spaces.Discrete) or action_space.n != 2 * shape[0] * shape[1]:
+        raise ValueError(f"模型的动作空间 {action_space} 与观测 {shape} 不匹配，"
+                         f"需要 Discrete({2 * shape[0] * shape[1]})；旧版模型请用当前版本重新训练")
+
+def load_model(path):
+    """加载训练好的模型：优先用支持动作掩码的 MaskablePPO，没有安装 sb3-contrib 或是普通 PPO 模型时退回 PPO
+
+    模型的观测和动作空间不是当前的编码时抛出 ValueError。
+    """
+    try:
+        from sb3_contrib import MaskablePPO
+        model = MaskablePPO.load(path)
+    except (ImportError, ValueError):  # 没有安装 sb3-contrib，或模型的策略不是 MaskableActorCriticPolicy
+        from stable_baselines3 import PPO
+        model = PPO.load(path)
+    check_spaces(model.observation_space, model.action_space)
+    return model
+
+def predict_masked(model, obs, masks, deterministic=False):
+    """带动作掩码的推理；普通 PPO 没有掩码参数时，直接在策略输出的 logits 上屏蔽非法动作"""
+    if "action_masks" in inspect.signature(model.predict).parameters:
+        action, _ = model.predict(obs, deterministic=deterministic, action_masks=masks)
+        return action
+
+    import torch
+    obs_tensor, vectorized = model.policy.obs_to_tensor(obs)
+    with torch.no_grad():
+        logits = model.policy.get_distribution(obs_tensor).distribution.logits
+    logits = logits.masked_fill(~torch.as_tensor(masks, device=logits.device).reshape(logits.shape), -torch.inf)
+    if deterministic:
+        action = logits.argmax(dim=-1)
+    else:
+        action = torch.distributions.Categorical(logits=logits).sample()
+    action = action.cpu().numpy()
+    return action if vectorized else action[0]
+
+def encode_cells(revealed, numbers, flags):
+    """把任意形状的棋盘状态编码成观测值（flags 按 0/1 直接参与运算，不需要 Python 循环）"""
+    return np.where(revealed, numbers, flags.view(np.int8) + UNKNOWN)
+
+class ObservationBuffer:
+    """常驻的观测缓冲区：只更新上一次操作改变的格子，训练环境和界面里的训练AI共用
+
+    view 是同一块内存的只读视图，可以直接交给策略网络而不复制。
+    """
+
+    def __init__(self, engine, size=OBS_SIZE):
+        self.engine = engine
+        self.size = size
+        self.buffer = np.full((size, size), OUTSIDE, dtype=np.int8)
+        self.view = self.buffer.view()
+        self.view.flags.writeable = False
+        self.version = None  # 缓冲区对应的引擎版本
+
+    def reset(self):
+        self.version = None
+
+    def sync(self, changed=None, moves=1):
+        """把引擎的变化同步到缓冲区；changed 为最近 moves 次操作改变的格子，对不上时整体重建"""
+        if self.version == self.engine.version:
+            return self.view
+        if changed is None or self.version is None or self.engine.version != self.version + moves:
+            return self.rebuild()
+        self.update(changed)
+        self.version = self.engine.version
+        return self.view
+
+    def fits(self):
+        """当前棋盘能否放进观测"""
+        return self.engine.rows <= self.size and self.engine.cols <= self.size
+
+    def rebuild(self):
+        engine = self.engine
+        self.buffer.fill(OUTSIDE)
+        self.buffer[:engine.rows, :engine.cols] = encode_cells(engine.revealed, engine.numbers, engine.flags)
+        self.version = engine.version
+        return self.view
+
+    def update(self, cells):
+        if not cells:
+            return
+        xs, ys = np.array(cells, dtype=np.int64).T
+        engine = self.engine
+        self.buffer[xs, ys] = encode_cells(engine.revealed[xs, ys], engine.numbers[xs, ys], engine.flags[xs, ys])
+
+    def action_masks(self):
+        return action_masks(self.buffer)
+
+if __name__ == "__main__":
+    print("这是扫雷强化学习的观测缓冲区")
@@ -0,0 +1,108 @@
+# mine_sweep_policy.py
+from functools import partial
+import numpy as np
+import torch
+from torch import nn
+import torch.nn.functional as F
+from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
+from mine_sweep_observation import OUTSIDE, UNKNOWN
+
+try:
+    from sb3_contrib.common.maskable.policies import MaskableActorCriticPolicy as BasePolicy
+except ImportError:
+    from stable_baselines3.common.policies import ActorCriticPolicy as BasePolicy
+
+CELL_STATES = 11  # 每格的 one-hot 编码：未打开、插旗、数字 0~8；地图外为全 0
+MASKED_LOGIT = -1e8  # 地图外格子的 logit，softmax 后概率为 0，熵也不会出现 nan
+
+def crop_boards(obs):
+    """把一批观测裁剪到这批棋盘中最大的实际尺寸，返回 (裁剪后的观测, 地图内掩码)"""
+    inside = obs != OUTSIDE
+    rows = int(inside.any(dim=2).sum(dim=1).max())  # 地图总在左上角，地图内的行数就是棋盘行数
+    cols = int(inside.any(dim=1).sum(dim=1).max())
+    return obs[:, :rows, :cols], inside[:, :rows, :cols]
+
+class BoardFeaturesExtractor(BaseFeaturesExtractor):
+    """全卷积特征提取：只在实际棋盘区域上计算，输出每个格子的特征
+
+    一批中棋盘大小不同时按最大的棋盘裁剪，较小棋盘多出的部分与卷积的零填充一样置 0，
+    因此同一局无论和谁一起批量计算、放在多大的观测里，结果都相同。
+    返回 (特征 (N, C, rows, cols), 地图内掩码 (N, rows, cols))。
+    """
+
+    def __init__(self, observation_space, channels=32, layers=5):
+        super().__init__(observation_space, features_dim=channels)
+        self.input = nn.Conv2d(CELL_STATES, channels, 3, padding=1)
+        self.convs = nn.ModuleList(nn.Conv2d(channels, channels, 3, padding=1) for _ in range(layers - 1))
+
+    def forward(self, observations):
+        obs, inside = crop_boards(observations)
+        mask = inside.unsqueeze(1).float()
+        states = (obs - UNKNOWN).long().clamp(min=0)
+        x = F.one_hot(states, CELL_STATES).permute(0, 3, 1, 2).float() * mask
+        x = F.relu(self.input(x)) * mask
+        for conv in self.convs:
+            x = F.relu(conv(x)) * mask
+        return x, inside
+
+class CellHead(nn.Module):
+    """代替 SB3 的 mlp_extractor：策略是每个格子的 (打开, 插旗) 两个 logit，价值来自掩码池化"""
+
+    def __init__(self, channels, size, hidden=64):
+        super().__init__()
+        self.size = size  # 观测边长
+        self.latent_dim_pi = 2 * size * size  # 直接就是动作 logits，顺序与动作编码一致
+        self.latent_dim_vf = hidden
+        self.cell_logits = nn.Conv2d(channels, 2, 1)
+        self.value = nn.Sequential(nn.Linear(2 * channels, hidden), nn.ReLU())
+
+    def forward(self, features):
+        return self.forward_actor(features), self.forward_critic(features)
+
+    def forward_actor(self, features):
+        x, inside = features
+        rows, cols = inside.shape[1:]
+        logits = self.cell_logits(x).masked_fill(~inside.unsqueeze(1), MASKED_LOGIT)
+        # 补回完整观测大小，动作下标为 action_type * size² + x * size + y
+        logits = F.pad(logits, (0, self.size - cols, 0, self.size - rows), value=MASKED_LOGIT)
+        return logits.flatten(1)
+
+    def forward_critic(self, features):
+        x, inside = features
+        mask = inside.unsqueeze(1)
+        area = mask.sum(dim=(2, 3)).clamp(min=1)
+        mean = x.sum(dim=(2, 3)) / area
+        peak = x.masked_fill(~mask, 0).amax(dim=(2, 3))  # 特征经过 ReLU 非负，地图外置 0 不影响最大值
+        return self.value(torch.cat([mean, peak], dim=1))
+
+class CellPolicy(BasePolicy):
+    """与棋盘大小无关的卷积策略：安装了 sb3-contrib 时基于 MaskableActorCriticPolicy，否则基于 ActorCriticPolicy
+
+    网络宽度和深度通过 policy_kwargs=dict(features_extractor_kwargs=dict(channels=..., layers=...)) 调整。
+    """
+
+    def __init__(self, observation_space, action_space, lr_schedule, **kwargs):
+        kwargs.pop("use_sde", None)  # 普通 PPO 会传入 use_sde，离散动作用不到，MaskableActorCriticPolicy 也不接受
+        kwargs.setdefault("features_extractor_class", BoardFeaturesExtractor)
+        super().__init__(observation_space, action_space, lr_schedule, **kwargs)
+
+    def _build(self, lr_schedule):
+        # 不用 SB3 默认的 Linear(latent, n_actions) 动作层：logits 已由卷积逐格给出
+        self.mlp_extractor = CellHead(self.features_dim, self.observation_space.shape[-1])
+        self.action_net = nn.Identity()
+        self.value_net = nn.Linear(self.mlp_extractor.latent_dim_vf, 1)
+
+        if self.ortho_init:
+            module_gains = {
+                self.features_extractor: np.sqrt(2),
+                self.mlp_extractor: np.sqrt(2),
+                self.mlp_extractor.cell_logits: 0.01,
+                self.value_net: 1,
+            }
+            for module, gain in module_gains.items():
+                module.apply(partial(self.init_weights, gain=gain))
+
+        self.optimizer = self.optimizer_class(self.parameters(), lr=lr_schedule(1), **self.optimizer_kwargs)
+
+if __name__ == "__main__":
+    print("这是扫雷强化学习的全卷积策略网络")
@@ -0,0 +1,92 @@
+# mine_sweep_profiler.py
+import csv
+import time
+
+class _NullPhase:
+    """关闭时使用的空计时器，所有阶段共用同一个实例"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_PHASE = _NullPhase()
+
+class _Phase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name + "_ms", (time.perf_counter() - self.start) * 1000)
+        return False
+
+class Profiler:
+    """AI 的分阶段计时器和计数器，可以随时开关
+
+    每一步（一次决策）的各阶段耗时和计数记为一行：phase() 计时，add() 累加，record() 记录当前值，
+    end_step() 结束这一行。关闭时这些调用只做一次属性判断就返回，热路径上的开销可以忽略。
+    """
+
+    def __init__(self, enabled=False, window=100):
+        self.enabled = enabled
+        self.window = window  # 滚动汇总使用最近多少步
+        self.steps = []  # 每步一个 {名称: 值}，用于导出 CSV
+        self.current = {}
+
+    def phase(self, name):
+        """with profiler.phase("sync"): ... 把耗时累加到当前步的 sync_ms"""
+        if not self.enabled:
+            return NULL_PHASE
+        return _Phase(self, name)
+
+    def add(self, name, value=1):
+        if self.enabled:
+            self.current[name] = self.current.get(name, 0) + value
+
+    def record(self, name, value):
+        if self.enabled:
+            self.current[name] = value
+
+    def end_step(self):
+        if self.enabled and self.current:
+            self.steps.append(self.current)
+            self.current = {}
+
+    def clear(self):
+        self.steps = []
+        self.current = {}
+
+    def summary(self):
+        """最近 window 步中各项的每步平均值"""
+        recent = self.steps[-self.window:]
+        totals = {}
+        for step in recent:
+            for name, value in step.items():
+                totals[name] = totals.get(name, 0) + value
+        return {name: total / len(recent) for name, total in totals.items()}
+
+    def summary_text(self):
+        summary = self.summary()
+        if not summary:
+            return ""
+        parts = [f"{name[:-3]} {value:.2f}ms" if name.endswith("_ms") else f"{name} {value:.1f}"
+                 for name, value in summary.items()]
+        return f"last {min(len(self.steps), self.window)} steps (avg): " + " | ".join(parts)
+
+    def write_csv(self, path, steps=None):
+        """把每一步的记录写成 CSV，某一步没有的列填 0"""
+        steps = self.steps if steps is None else steps
+        fields = list(dict.fromkeys(name for step in steps for name in step))
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields, restval=0)
+            writer.writeheader()
+            writer.writerows(steps)
+
+if __name__ == "__main__":
+    print("这是扫雷AI的分阶段性能分析器")
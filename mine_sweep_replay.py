@@ -0,0 +1,118 @@
+# mine_sweep_replay.py
+import argparse
+import cProfile
+import gzip
+import json
+import pstats
+import random
+import time
+from mine_sweep_engine import MineSweeperEngine
+
+REPLAY_VERSION = 1
+
+def record_game(engine):
+    """把一局游戏压缩成回放记录：种子 + 棋盘配置 + 带时间戳的操作列表
+
+    开局即布雷（训练环境，首次点击不保证安全）的对局额外记录 "mines_at_reset"。
+    """
+    record = {
+        "v": REPLAY_VERSION,
+        "seed": engine.seed,
+        "rows": engine.rows,
+        "cols": engine.cols,
+        "mines": engine.mine_num,
+        "moves": [list(move) for move in engine.moves],
+    }
+    if engine.mines_at_reset:
+        record["mines_at_reset"] = True
+    return record
+
+def save_replay(record, path):
+    """保存回放记录；文件名以 .gz 结尾时压缩保存"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        json.dump(record, f, separators=(",", ":"))
+
+def load_replay(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        record = json.load(f)
+    if record.get("v") != REPLAY_VERSION:
+        raise ValueError(f"不支持的回放版本：{record.get('v')}")
+    return record
+
+def new_engine(record):
+    """按回放记录中的种子和配置重新开一局（首次点击后得到与原局完全相同的棋盘；开局即布雷的对局立即布雷）"""
+    engine = MineSweeperEngine(record["rows"], record["cols"], record["mines"], seed=record["seed"])
+    if record.get("mines_at_reset"):
+        engine.generate_mines()
+    return engine
+
+def replay(record, engine=None):
+    """无界面全速回放，返回回放后的引擎；操作与原局不一致时抛出 ValueError"""
+    engine = engine or new_engine(record)
+    actions = {"o": engine.open_cell, "c": engine.chord}
+    for index, (_, action, x, y) in enumerate(record["moves"]):
+        if action == "f":
+            valid = engine.toggle_flag(x, y)
+        else:
+            valid = actions[action](x, y) is not None
+        if not valid:
+            raise ValueError(f"第 {index + 1} 步操作无效：{action} ({x}, {y})")
+    return engine
+
+def resolve(record, guess=True):
+    """用当前的逻辑AI在同一棋盘、同一首次点击下重新玩一局，用于比较不同版本的求解器"""
+    from mine_sweep_benchmark import play_logical_game
+    engine = new_engine(record)
+    first = next(((x, y) for _, action, x, y in record["moves"] if action == "o"), None)
+    rng = random.Random(f"ai-{record['seed']}-0")
+    guesses, latencies, stage_stats = play_logical_game(engine, guess, rng, first_click=first)
+    return engine, guesses, latencies, stage_stats
+
+def describe(engine):
+    if engine.win:
+        return "胜利"
+    if engine.exploded is not None:
+        return f"踩雷 {engine.exploded}"
+    return "未结束"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="扫雷回放：无界面全速重放记录的对局")
+    parser.add_argument("replay", help="回放文件（.json 或 .json.gz）")
+    parser.add_argument("--resolve", action="store_true", help="不重放原操作，而是用当前的逻辑AI重新求解同一棋盘")
+    parser.add_argument("--no-guess", action="store_true", help="--resolve 时不做概率猜测")
+    parser.add_argument("--profile", action="store_true", help="在 cProfile 下运行并打印最耗时的函数")
+    parser.add_argument("--save", help="--resolve 时把新的对局保存为回放文件")
+    args = parser.parse_args(argv)
+
+    record = load_replay(args.replay)
+    if args.resolve:
+        import mine_sweep_benchmark  # 先导入，避免把导入时间算进性能分析
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    start = time.perf_counter()
+    if args.resolve:
+        engine, guesses, latencies, _ = resolve(record, guess=not args.no_guess)
+    else:
+        engine = replay(record)
+    elapsed = time.perf_counter() - start
+    if profiler:
+        profiler.disable()
+
+    print(f"{record['rows']}x{record['cols']}x{record['mines']} seed={record['seed']}  "
+          f"原局 {len(record['moves'])} 步，本次 {len(engine.moves)} 步  结果：{describe(engine)}  "
+          f"用时 {elapsed * 1000:.1f} 毫秒")
+    if args.resolve:
+        print(f"猜测 {guesses} 次，最长一次决策 {max(latencies, default=0) * 1000:.2f} 毫秒")
+        from mine_sweep_cache import COMPONENT_CACHE
+        print(COMPONENT_CACHE.report())
+        if args.save:
+            save_replay(record_game(engine), args.save)
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    return engine
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,680 @@
+# mine_sweep_solver.py
+import math
+import random
+import time
+import numpy as np
+from mine_sweep_cache import COMPONENT_CACHE, canonical_component
+from mine_sweep_engine import NEIGHBOR_MASK_OFFSETS
+from mine_sweep_profiler import Profiler
+
+# 线性代数推理只处理未知格不超过该数量的约束系统，更大的交给概率求解
+LINEAR_MAX_UNKNOWNS = 150
+
+def reduce_rows(rows):
+    """对稀疏整数行 ({列: 系数}, 右端) 做无分数的高斯-若尔当消元，返回化简后的非零行"""
+    pivots = []  # [(主元列, 系数, 右端)]
+    for coef, rhs in rows:
+        coef = dict(coef)
+        for col, pivot_coef, pivot_rhs in pivots:
+            if col in coef:
+                coef, rhs = eliminate(coef, rhs, pivot_coef, pivot_rhs, col)
+        if not coef:
+            continue
+        col = min(coef)
+        # 用新主元消去已有各行中的该列
+        for i, (other_col, other_coef, other_rhs) in enumerate(pivots):
+            if col in other_coef:
+                other_coef, other_rhs = eliminate(other_coef, other_rhs, coef, rhs, col)
+                pivots[i] = (other_col, other_coef, other_rhs)
+        pivots.append((col, coef, rhs))
+    return [(coef, rhs) for _, coef, rhs in pivots]
+
+def eliminate(coef, rhs, pivot_coef, pivot_rhs, col):
+    """row * p - pivot_row * a，消去 col 列，并除以公约数"""
+    a = coef[col]
+    p = pivot_coef[col]
+    result = {c: v * p for c, v in coef.items()}
+    for c, v in pivot_coef.items():
+        result[c] = result.get(c, 0) - v * a
+    result = {c: v for c, v in result.items() if v}
+    rhs = rhs * p - pivot_rhs * a
+    divisor = math.gcd(rhs, *result.values())
+    if divisor > 1:
+        result = {c: v // divisor for c, v in result.items()}
+        rhs //= divisor
+    return result, rhs
+
+# 概率求解：未知格不超过该数量的分量精确枚举，搜索节点超过上限时同样改用蒙特卡洛估计
+EXACT_MAX_UNKNOWNS = 60
+EXACT_MAX_NODES = 100000
+# 蒙特卡洛估计至少达到的有效样本数（ESS）：样本权重差异很大时，原始样本数再多估计也可能很不准
+MONTE_CARLO_MIN_ESS = 100
+
+_MISSING = object()
+
+# 一次同步的变化格子超过该数量时（例如大片空白被展开），用数组运算筛出真正需要更新的约束
+SYNC_VECTOR_MIN = 64
+
+# 约束之间的位运算：把数字格的 8 位邻格掩码放进以它为中心的 8x8 窗口，偏移 (dx, dy) 对应第 (dx + 3) * 8 + dy + 3 位。
+# 共享未知格的两个约束相距不超过 2 格，把一方的窗口平移到另一方的中心后仍在窗口内，
+# 子集、交集、差集都变成小整数的位运算，不必为每一对约束创建集合
+WINDOW_WIDTH = 8
+MASK_COUNTS = np.array([mask.bit_count() for mask in range(256)], dtype=np.int8)  # 8 位掩码中 1 的个数
+WINDOW_MASKS = [sum(1 << (dx + 3) * WINDOW_WIDTH + dy + 3 for dx, dy in offsets) for offsets in NEIGHBOR_MASK_OFFSETS]
+
+def window_cells(origin, mask):
+    """以 origin 为中心的窗口掩码中为 1 的位对应的格子（只在得出结论时才转换）"""
+    x, y = origin
+    cells = []
+    while mask:
+        low = mask & -mask
+        dx, dy = divmod(low.bit_length() - 1, WINDOW_WIDTH)
+        cells.append((x + dx - 3, y + dy - 3))
+        mask ^= low
+    return cells
+
+class MineSweeperSolver:
+    """无界面的推理器：维护约束边界，只在发生变化的格子附近增量更新"""
+
+    def __init__(self, engine, linear=True, cache=COMPONENT_CACHE, profiler=None):
+        self.engine = engine
+        self.cache = cache  # 分量精确解的置换表，None 表示不缓存
+        self.profiler = profiler or Profiler()  # 默认关闭
+        # 推理阶段按代价从低到高排列，可以增删
+        # 精确枚举（结果经置换表缓存）最贵，放在线性代数推理之后，只在其他阶段都推不出时运行
+        self.stages = [("single", self.infer_single),
+                       ("subset", self.infer_subset),
+                       ("2-1", self.infer_two_one)]
+        if linear:
+            self.stages.append(("linear", self.infer_linear))
+        self.stages.append(("exact", self.infer_exact))
+        self.stage_stats = {name: {"calls": 0, "time": 0.0, "found": 0} for name, _ in self.stages}
+        self.time_budget = 0.05  # 每次概率推测中蒙特卡洛采样的时间预算（秒）
+        self.max_time_budget = 1.0  # 有效样本数不足 MONTE_CARLO_MIN_ESS 时预算最多延长到这么多秒
+        # 约束边界：已打开的数字格 -> (剩余雷数, 未打开且未插旗的邻格, 这些邻格的 8 位掩码)
+        self.constraints = {}
+        # 空间索引：未知格 -> 包含它的约束（数字格）集合，用于只枚举共享未知格的约束对
+        self.cell_constraints = {}
+        # 与插旗矛盾的已打开格子：周围已没有未知格但旗数不等于数字，或空白格旁边插了旗（只会由插错旗造成）
+        self.contradictions = set()
+        self.version = None  # 边界对应的引擎版本
+
+    def reset(self):
+        self.constraints.clear()
+        self.cell_constraints.clear()
+        self.contradictions.clear()
+        self.version = None
+
+    def sync(self, changed=None, moves=1):
+        """把引擎的变化同步到边界
+
+        changed 为最近 moves 次操作产生变化的格子（打开或插旗），
+        如果引擎期间还有其他操作（例如玩家手动点击），则整体重建边界
+        """
+        if changed is None or self.version is None or self.engine.version != self.version + moves:
+            self.rebuild()
+            return
+        if len(changed) > SYNC_VECTOR_MIN:
+            self.sync_many(changed)
+            return
+
+        affected = set()
+        for x, y in changed:
+            if self.engine.revealed[x, y]:
+                affected.add((x, y))
+            for nx, ny in self.engine.neighbors(x, y):
+                if self.engine.revealed[nx, ny]:
+                    affected.add((nx, ny))
+
+        for x, y in affected:
+            self.update_constraint(x, y)
+        self.version = self.engine.version
+
+    def sync_many(self, changed):
+        """大批量变化的增量同步：只更新原本就在边界上、或旁边还有未知格的数字格
+
+        大片展开区域内部的格子周围已经全部打开，不会产生约束，不必逐格检查。
+        """
+        engine = self.engine
+        xs, ys = np.array(changed, dtype=np.int64).reshape(-1, 2).T
+        nx = (xs[:, None] + np.arange(-1, 2).repeat(3)).reshape(-1)
+        ny = (ys[:, None] + np.tile(np.arange(-1, 2), 3)).reshape(-1)
+        inside = (nx >= 0) & (nx < engine.rows) & (ny >= 0) & (ny < engine.cols)
+        cells = np.unique(nx[inside] * engine.cols + ny[inside])
+        xs, ys = np.divmod(cells, engine.cols)
+        revealed = engine.revealed[xs, ys]
+        xs, ys = xs[revealed], ys[revealed]
+        mismatched = MASK_COUNTS[engine.flag_bits[xs, ys]] != engine.numbers[xs, ys]
+        numbered = (engine.numbers[xs, ys] > 0) | mismatched
+        xs, ys = xs[numbered], ys[numbered]
+        frontier = (engine.unknown_bits[xs, ys] != 0) | mismatched[numbered]
+        for x, y, on_frontier in zip(xs.tolist(), ys.tolist(), frontier.tolist()):
+            if on_frontier or (x, y) in self.constraints:
+                self.update_constraint(x, y)
+        for x, y in list(self.contradictions):  # 取消插旗后矛盾可能已经消除
+            self.update_constraint(x, y)
+        self.version = engine.version
+
+    def rebuild(self):
+        """整体重建边界：只检查旁边有未知格的数字格，以及旗数与数字不符的格子"""
+        engine = self.engine
+        self.constraints.clear()
+        self.cell_constraints.clear()
+        self.contradictions.clear()
+        mismatched = MASK_COUNTS[engine.flag_bits] != engine.numbers
+        xs, ys = np.nonzero(engine.revealed & (((engine.numbers > 0) & (engine.unknown_bits != 0)) | mismatched))
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self.update_constraint(x, y)
+        self.version = engine.version
+
+    def update_constraint(self, x, y):
+        """重新计算 (x, y) 的约束；没有未知邻格时移出边界，此时旗数与数字不符记为矛盾"""
+        self.contradictions.discard((x, y))
+        old = self.constraints.pop((x, y), None)
+        if old is not None:
+            for cell in old[1]:
+                owners = self.cell_constraints[cell]
+                owners.discard((x, y))
+                if not owners:
+                    del self.cell_constraints[cell]
+
+        if not self.engine.revealed[x, y]:
+            return
+        number = int(self.engine.numbers[x, y])
+        remaining = number - int(self.engine.flag_bits[x, y]).bit_count()
+        bits = int(self.engine.unknown_bits[x, y])
+        if bits and number > 0:
+            unopened = tuple((x + dx, y + dy) for dx, dy in NEIGHBOR_MASK_OFFSETS[bits])
+            self.constraints[(x, y)] = (remaining, unopened, bits)
+            for cell in unopened:
+                self.cell_constraints.setdefault(cell, set()).add((x, y))
+        elif remaining != 0:
+            self.contradictions.add((x, y))
+
+    def candidate_pairs(self):
+        """枚举至少共享一个未知格的约束对（每对只出现一次）
+
+        产生 (A, A 的剩余雷数, A 的窗口掩码, B, B 的剩余雷数, B 平移到 A 的窗口中的掩码)。
+        只产生 A < B 的对，B 在 A 的下方或同一行的右侧，平移量总是正的。
+        """
+        constraints = self.constraints
+        pairs = 0
+        for cell_A, (remaining_A, U_A, bits_A) in constraints.items():
+            partners = set()
+            for cell in U_A:
+                partners |= self.cell_constraints[cell]
+            mask_A = WINDOW_MASKS[bits_A]
+            x, y = cell_A
+            for cell_B in partners:
+                if cell_A < cell_B:
+                    pairs += 1
+                    remaining_B, _, bits_B = constraints[cell_B]
+                    mask_B = WINDOW_MASKS[bits_B] << (cell_B[0] - x) * WINDOW_WIDTH + cell_B[1] - y
+                    yield cell_A, remaining_A, mask_A, cell_B, remaining_B, mask_B
+        self.profiler.add("pairs", pairs)
+
+    def infer(self):
+        """依次运行各推理阶段，某一阶段有结论就返回 (to_open, to_flag)，后面更贵的阶段不再运行"""
+        profiler = self.profiler
+        profiler.record("frontier", len(self.cell_constraints))
+        for name, stage in self.stages:
+            start = time.perf_counter()
+            to_open, to_flag = stage()
+            elapsed = time.perf_counter() - start
+            stats = self.stage_stats[name]
+            stats["calls"] += 1
+            stats["time"] += elapsed
+            stats["found"] += len(to_open) + len(to_flag)
+            profiler.add(name + "_ms", elapsed * 1000)
+            if to_open or to_flag:
+                profiler.add("found", len(to_open) + len(to_flag))
+                return to_open, to_flag
+        return [], []
+
+    def stage_report(self):
+        """各推理阶段的调用次数、累计耗时和推出的格子数"""
+        return "\n".join(f"{name}: calls={stats['calls']} time={stats['time'] * 1000:.1f}ms found={stats['found']}"
+                         for name, stats in self.stage_stats.items())
+
+    def infer_single(self):
+        """单格推理：剩余雷数为 0 或等于未知格数"""
+        to_open = []
+        to_flag = []
+        for remaining, unopened, _ in self.constraints.values():
+            if len(unopened) == remaining:
+                to_flag.extend(unopened)
+            if remaining == 0:
+                to_open.extend(unopened)
+        return to_open, to_flag
+
+    def infer_subset(self):
+        """二格推理：一个约束的未知格是另一个的真子集（在 A 的窗口中做位运算）"""
+        to_open = []
+        to_flag = []
+        for cell_A, remaining_A, U_A, _, remaining_B, U_B in self.candidate_pairs():
+            common = U_A & U_B
+            if common == U_A:
+                remaining_small, remaining_large = remaining_A, remaining_B
+            elif common == U_B:
+                remaining_small, remaining_large = remaining_B, remaining_A
+            else:
+                continue
+            diff = U_A ^ U_B
+            if not diff:
+                continue
+            if remaining_small == remaining_large:
+                to_open.extend(window_cells(cell_A, diff))
+            elif remaining_large - remaining_small == diff.bit_count():
+                to_flag.extend(window_cells(cell_A, diff))
+        return to_open, to_flag
+
+    def infer_two_one(self):
+        """2-1 推理：相邻两个数字格共享两个未知格，各自多出一个"""
+        to_open = []
+        to_flag = []
+        for cell_A, remaining_A, U_A, cell_B, remaining_B, U_B in self.candidate_pairs():
+            (x1, y1), (x2, y2) = cell_A, cell_B
+            if abs(x1 - x2) > 1 or abs(y1 - y2) > 1:
+                continue
+
+            common = U_A & U_B
+            if common.bit_count() != 2:
+                continue
+            diff_A = U_A ^ common
+            diff_B = U_B ^ common
+            if diff_A.bit_count() == 1 and diff_B.bit_count() == 1:
+                if remaining_A - remaining_B == 1:
+                    to_flag.extend(window_cells(cell_A, diff_A))
+                    to_open.extend(window_cells(cell_A, diff_B))
+                elif remaining_B - remaining_A == 1:
+                    to_flag.extend(window_cells(cell_A, diff_B))
+                    to_open.extend(window_cells(cell_A, diff_A))
+        return to_open, to_flag
+
+    def infer_exact(self):
+        """精确推理：枚举每个分量的所有方案（先查置换表），所有方案中都无雷的格子安全，都有雷的格子是雷"""
+        to_open = []
+        to_flag = []
+        remaining_mines = self.engine.get_remaining_mines()
+        for constraint_cells, unknowns in self.components():
+            solution = self.exact_solution(constraint_cells, unknowns, remaining_mines)
+            if solution is None or not solution[1]:
+                continue
+            groups, counts, group_mines = solution
+            total = sum(counts.values())
+            for i, cells in enumerate(groups):
+                mines = sum(totals[i] for totals in group_mines.values())
+                if mines == 0:
+                    to_open.extend(cells)
+                elif mines == total * len(cells):
+                    to_flag.extend(cells)
+        return to_open, to_flag
+
+    def infer_linear(self):
+        """线性代数推理：对每个分量的约束矩阵做整数高斯消元，再对每一行做 0/1 取值的边界推理
+
+        能推出需要三个及以上约束联合才能得到的结论。
+        内部格子数为 0 时加入“剩余雷数”这一全局约束；合并后的方程组太大时仍按分量分别求解，只是不带全局约束。
+        """
+        to_open = []
+        to_flag = []
+        components = self.components()
+        frontier_size = sum(len(unknowns) for _, unknowns in components)
+        if self.unknown_count() == frontier_size and frontier_size <= LINEAR_MAX_UNKNOWNS:
+            # 没有内部格子：所有分量通过全局雷数联系在一起
+            unknowns = [cell for _, cells in components for cell in cells]
+            systems = [([cell for cells, _ in components for cell in cells], unknowns,
+                        [(unknowns, self.engine.get_remaining_mines())])]
+        else:
+            systems = [(constraint_cells, unknowns, []) for constraint_cells, unknowns in components]
+
+        for constraint_cells, unknowns, extra_rows in systems:
+            if len(unknowns) > LINEAR_MAX_UNKNOWNS:
+                continue
+            column = {cell: i for i, cell in enumerate(unknowns)}
+            rows = [({column[cell]: 1 for cell in self.constraints[c][1]}, self.constraints[c][0])
+                    for c in constraint_cells]
+            rows += [({column[cell]: 1 for cell in cells}, remaining) for cells, remaining in extra_rows]
+
+            for coef, rhs in reduce_rows(rows):
+                positive = sum(v for v in coef.values() if v > 0)
+                negative = sum(v for v in coef.values() if v < 0)
+                if rhs == positive:
+                    # 系数为正的必为雷，为负的必安全
+                    to_flag.extend(unknowns[i] for i, v in coef.items() if v > 0)
+                    to_open.extend(unknowns[i] for i, v in coef.items() if v < 0)
+                elif rhs == negative:
+                    to_flag.extend(unknowns[i] for i, v in coef.items() if v < 0)
+                    to_open.extend(unknowns[i] for i, v in coef.items() if v > 0)
+        return to_open, to_flag
+
+    def frontier_probabilities(self):
+        """每个边界格子的雷概率（取周围数字格局部比例的最小值）"""
+        probability_map = {}
+        for remaining, unopened, _ in self.constraints.values():
+            local_prob = remaining / len(unopened)
+            for cell in unopened:
+                probability_map[cell] = min(probability_map.get(cell, 1.0), local_prob)
+        return probability_map
+
+    def components(self):
+        """把边界拆成互不相关的分量，返回 [(约束格列表, 未知格列表)]"""
+        result = []
+        visited = set()
+        for start in self.constraints:
+            if start in visited:
+                continue
+            visited.add(start)
+            queue = [start]
+            unknowns = set()
+            for constraint in queue:
+                for cell in self.constraints[constraint][1]:
+                    if cell in unknowns:
+                        continue
+                    unknowns.add(cell)
+                    for other in self.cell_constraints[cell]:
+                        if other not in visited:
+                            visited.add(other)
+                            queue.append(other)
+            result.append((queue, list(unknowns)))
+        return result
+
+    def group_unknowns(self, constraint_cells, unknowns):
+        """把所属约束完全相同的未知格合并为一组，返回 [(格子列表, 约束下标列表)]
+
+        按约束之间的相邻关系排序，使约束尽早被完全赋值、尽早剪枝
+        """
+        index = {cell: i for i, cell in enumerate(constraint_cells)}
+        members = {}
+        for unknown in unknowns:
+            key = frozenset(index[owner] for owner in self.cell_constraints[unknown])
+            members.setdefault(key, []).append(unknown)
+        return [(cells, sorted(key)) for key, cells in sorted(members.items(), key=lambda item: min(item[0]))]
+
+    def solve_component(self, constraint_cells, unknowns, max_mines):
+        """回溯枚举一个分量中所有满足约束的布雷方案
+
+        一组放 m 个雷有 C(g, m) 种方案。返回 (groups, counts, group_mines)：
+        counts[k] 为分量内共 k 个雷的方案数，group_mines[k][i] 为这些方案中第 i 组的雷数之和；
+        搜索节点超过 EXACT_MAX_NODES 时返回 None
+        """
+        groups = self.group_unknowns(constraint_cells, unknowns)
+        remaining = [self.constraints[cell][0] for cell in constraint_cells]
+        left = [len(self.constraints[cell][1]) for cell in constraint_cells]
+        assigned = [0] * len(constraint_cells)
+
+        counts = {}
+        group_mines = {}
+        choice = [0] * len(groups)
+        nodes = [0]
+
+        def search(j, mines, weight):
+            nodes[0] += 1
+            if nodes[0] > EXACT_MAX_NODES:
+                return
+            if j == len(groups):
+                counts[mines] = counts.get(mines, 0) + weight
+                totals = group_mines.setdefault(mines, [0] * len(groups))
+                for i, m in enumerate(choice):
+                    if m:
+                        totals[i] += weight * m
+                return
+
+            cells, owners = groups[j]
+            size = len(cells)
+            for c in owners:
+                left[c] -= size
+            for m in range(min(size, max_mines - mines) + 1):
+                if any(assigned[c] + m > remaining[c] for c in owners):
+                    break
+                if any(assigned[c] + m + left[c] < remaining[c] for c in owners):
+                    continue
+                for c in owners:
+                    assigned[c] += m
+                choice[j] = m
+                search(j + 1, mines + m, weight * math.comb(size, m))
+                for c in owners:
+                    assigned[c] -= m
+            choice[j] = 0
+            for c in owners:
+                left[c] += size
+
+        search(0, 0, 1)
+        if nodes[0] > EXACT_MAX_NODES:
+            return None
+        return [cells for cells, _ in groups], counts, group_mines
+
+    def exact_solution(self, constraint_cells, unknowns, max_mines):
+        """分量的精确解 (groups, counts, group_mines)，分量太大无法精确求解时返回 None
+
+        结果只取决于约束的形状，按规范编码存入置换表：同一局中没有变化的分量、
+        以及别处（或上一局）出现过的相同形状（平移、旋转、翻转后相同）都只需查表。
+        """
+        if len(unknowns) > EXACT_MAX_UNKNOWNS:
+            return None
+        max_mines = min(max_mines, len(unknowns))
+        if self.cache is None:
+            return self.solve_component(constraint_cells, unknowns, max_mines)
+
+        key, order = canonical_component(self.constraints, constraint_cells, unknowns, max_mines)
+        entry = self.cache.get(key, _MISSING)
+        if entry is _MISSING:
+            solution = self.solve_component(constraint_cells, order, max_mines)
+            if solution is not None:
+                # 以规范顺序的下标保存，与具体位置无关
+                index = {cell: i for i, cell in enumerate(order)}
+                groups, counts, group_mines = solution
+                solution = (tuple(tuple(index[cell] for cell in cells) for cells in groups), counts,
+                            {k: tuple(totals) for k, totals in group_mines.items()})
+            entry = solution  # 搜索超出节点上限的分量同样记下来，下次直接改用采样
+            self.cache.put(key, entry)
+        if entry is None:
+            return None
+        groups, counts, group_mines = entry
+        return [[order[i] for i in cells] for cells in groups], counts, group_mines
+
+    def sample_component(self, constraint_cells, unknowns, max_mines, deadline, max_deadline, rng=random):
+        """蒙特卡洛估计一个分量的方案数（序贯重要性采样）
+
+        逐组随机放雷：只在满足约束上下界的雷数中按 C(g, m) 加权抽取，样本权重为每一步可选权重之和的乘积，
+        走进死路的样本权重为 0。这样 counts / group_mines 是精确值的无偏估计，可以直接代入 probabilities 的组合公式。
+        在 deadline（time.perf_counter() 时刻）前尽量多采样；到时有效样本数仍不足 MONTE_CARLO_MIN_ESS 时继续采样，
+        直到够数或到达 max_deadline。
+        返回 (groups, counts, group_mines, 样本数, 有效样本数)
+        """
+        groups = self.group_unknowns(constraint_cells, unknowns)
+        remaining = [self.constraints[cell][0] for cell in constraint_cells]
+        sizes = [len(self.constraints[cell][1]) for cell in constraint_cells]
+        combs = [[math.comb(len(cells), m) for m in range(len(cells) + 1)] for cells, _ in groups]
+
+        counts = {}
+        group_mines = {}
+        samples = 0
+        weight_sum = 0
+        weight_square_sum = 0
+        choice = [0] * len(groups)
+        while True:
+            now = time.perf_counter()
+            # 超过预算后才计算有效样本数（权重是大整数，平方和较贵）
+            if now >= deadline and (now >= max_deadline or weight_square_sum and
+                                    weight_sum * weight_sum >= MONTE_CARLO_MIN_ESS * weight_square_sum):
+                break
+            samples += 1
+            assigned = [0] * len(constraint_cells)
+            left = list(sizes)
+            mines = 0
+            weight = 1  # 用整数保存权重，避免大分量的乘积溢出
+            for j, (cells, owners) in enumerate(groups):
+                size = len(cells)
+                for c in owners:
+                    left[c] -= size
+                options = []
+                for m in range(min(size, max_mines - mines) + 1):
+                    if any(assigned[c] + m > remaining[c] for c in owners):
+                        break
+                    if any(assigned[c] + m + left[c] < remaining[c] for c in owners):
+                        continue
+                    options.append(m)
+                if not options:
+                    weight = 0
+                    break
+                option_weights = [combs[j][m] for m in options]
+                total = sum(option_weights)
+                m = rng.choices(options, option_weights)[0]
+                weight *= total
+                choice[j] = m
+                mines += m
+                for c in owners:
+                    assigned[c] += m
+
+            weight_sum += weight
+            weight_square_sum += weight * weight
+            if weight == 0:
+                continue
+            counts[mines] = counts.get(mines, 0) + weight
+            totals = group_mines.setdefault(mines, [0] * len(groups))
+            for i, m in enumerate(choice):
+                if m:
+                    totals[i] += weight * m
+
+        ess = weight_sum * weight_sum / weight_square_sum if weight_square_sum else 0.0
+        return [cells for cells, _ in groups], counts, group_mines, samples, ess
+
+    def unknown_count(self):
+        """未打开且未插旗的格子总数（O(1)）"""
+        return self.engine.mine_num + self.engine.safe_remaining - self.engine.flag_count
+
+    def probabilities(self, rng=random):
+        """计算雷概率
+
+        各分量独立求解后，按全局剩余雷数把分量与不受约束的内部格子组合起来。
+        小分量精确枚举（结果经置换表缓存）；未知格超过 EXACT_MAX_UNKNOWNS 或搜索超出节点上限的分量改用蒙特卡洛估计，
+        所有采样分量共享 time_budget 秒的时间预算，有效样本数不足时最多延长到 max_time_budget 秒。
+        返回 (边界格子 -> 雷概率, 内部格子的雷概率, 内部格子数, 置信度)；
+        置信度为 {"exact": 是否全部精确, "samples": 样本数, "ess": 最小有效样本数}。
+        局面无解（例如插错旗）时返回 None
+        """
+        if self.contradictions:
+            return None
+        remaining_mines = self.engine.get_remaining_mines()
+        solutions = []
+        sampled = []
+        frontier_size = 0
+        for constraint_cells, unknowns in self.components():
+            frontier_size += len(unknowns)
+            solution = self.exact_solution(constraint_cells, unknowns, remaining_mines)
+            if solution is None:
+                sampled.append(len(solutions))
+                solution = (constraint_cells, unknowns)
+            elif not solution[1]:
+                return None
+            solutions.append(solution)
+        interior = self.unknown_count() - frontier_size
+
+        # 精确求解不了的大分量：平分剩余的时间预算做采样
+        confidence = {"exact": not sampled, "samples": 0, "ess": None}
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        max_deadline = start + max(self.time_budget, self.max_time_budget)
+        for n, i in enumerate(sampled):
+            constraint_cells, unknowns = solutions[i]
+            now = time.perf_counter()
+            component_deadline = now + max(0.0, deadline - now) / (len(sampled) - n)
+            component_max_deadline = now + max(0.0, max_deadline - now) / (len(sampled) - n)
+            groups, counts, group_mines, samples, ess = self.sample_component(
+                constraint_cells, unknowns, remaining_mines, component_deadline, component_max_deadline, rng)
+            if not counts:
+                return None
+            solutions[i] = (groups, counts, group_mines)
+            confidence["samples"] += samples
+            confidence["ess"] = ess if confidence["ess"] is None else min(confidence["ess"], ess)
+
+        # 各分量的方案数多项式（雷数 -> 方案数），用浮点数并按最大值归一化避免溢出
+        polys = []
+        for _, counts, _ in solutions:
+            scale = max(counts.values())
+            polys.append({k: w / scale for k, w in counts.items()})
+
+        def convolve(a, b):
+            result = {}
+            for ka, wa in a.items():
+                for kb, wb in b.items():
+                    result[ka + kb] = result.get(ka + kb, 0.0) + wa * wb
+            return result
+
+        # 前缀/后缀卷积，得到“除某个分量外其余分量”的多项式
+        prefix = [{0: 1.0}]
+        for poly in polys:
+            prefix.append(convolve(prefix[-1], poly))
+        suffix = [{0: 1.0}]
+        for poly in reversed(polys):
+            suffix.append(convolve(suffix[-1], poly))
+        suffix.reverse()
+
+        # 内部格子放 j 个雷的方案数 C(interior, j)，取对数后归一化
+        log_comb = {}
+        for m in prefix[-1]:
+            j = remaining_mines - m
+            if 0 <= j <= interior:
+                log_comb[m] = math.lgamma(interior + 1) - math.lgamma(j + 1) - math.lgamma(interior - j + 1)
+        if not log_comb:
+            return None
+        log_max = max(log_comb.values())
+        interior_weight = {m: math.exp(value - log_max) for m, value in log_comb.items()}
+
+        total = sum(w * interior_weight.get(m, 0.0) for m, w in prefix[-1].items())
+        if total == 0:
+            return None
+
+        probability_map = {}
+        for i, (groups, counts, group_mines) in enumerate(solutions):
+            others = convolve(prefix[i], suffix[i + 1])
+            scale = max(counts.values())
+            for k in counts:
+                factor = sum(w * interior_weight.get(k + m, 0.0) for m, w in others.items()) / scale / total
+                if factor == 0:
+                    continue
+                for cells, mines in zip(groups, group_mines[k]):
+                    p = factor * mines / len(cells)
+                    for cell in cells:
+                        probability_map[cell] = probability_map.get(cell, 0.0) + p
+
+        interior_prob = 0.0
+        if interior > 0:
+            expected = sum(w * interior_weight.get(m, 0.0) * (remaining_mines - m)
+                           for m, w in prefix[-1].items()) / total
+            interior_prob = expected / interior
+        return probability_map, interior_prob, interior, confidence
+
+    def random_interior_cell(self, rng=random):
+        """随机返回一个不在边界上的未知格"""
+        for _ in range(100):
+            x, y = rng.randrange(self.engine.rows), rng.randrange(self.engine.cols)
+            if not self.engine.revealed[x, y] and not self.engine.flags[x, y] and (x, y) not in self.cell_constraints:
+                return x, y
+        candidates = [(int(x), int(y)) for x, y in np.argwhere(~self.engine.revealed & ~self.engine.flags)
+                      if (int(x), int(y)) not in self.cell_constraints]
+        return rng.choice(candidates) if candidates else None
+
+    def best_guess(self, rng=random):
+        """选出雷概率最低的格子；没有可选格子时返回 None"""
+        result = self.probabilities(rng)
+        if result is None:
+            # 局面无解时退回局部比例估计
+            probability_map, interior_prob, interior = self.frontier_probabilities(), 1.0, 0
+        else:
+            probability_map, interior_prob, interior, _ = result
+
+        best_cells = []
+        if probability_map:
+            min_probability = min(probability_map.values())
+            # 排序后再随机选择，结果与置换表中的条目来自哪一局无关
+            best_cells = sorted(pos for pos, prob in probability_map.items() if prob <= min_probability + 1e-12)
+            if interior == 0 or min_probability <= interior_prob + 1e-12:
+                return rng.choice(best_cells)
+        if interior > 0:
+            return self.random_interior_cell(rng)
+        return None
+
+if __name__ == "__main__":
+    print("这是扫雷的无界面推理器")
@@ -1,194 +1,389 @@
-#mine_sweep_to_train_ai.py
-import time
-import gymnasium as gym
-import numpy as np
-import gymnasium as gym
-from gymnasium import spaces
-from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import SubprocVecEnv
-from tqdm import tqdm
-import random
-import os
-
-class SimpleMineSweeper:
-    def __init__(self, rows=None, cols=None, mines=None):
-        # 随机生成地图尺寸和雷的数量
-        self.rows = random.randint(10, 50) if rows is None else rows
-        self.cols = random.randint(10, 50) if cols is None else cols
-        self.mines = random.randint(int(self.rows * self.cols * 0.05), int(self.rows * self.cols * 0.2)) if mines is None else mines
-        self.reset()
-
-    def reset(self):
-        self.board = np.zeros((self.rows, self.cols), dtype=np.int8)
-        self.revealed = np.zeros((self.rows, self.cols), dtype=bool)
-        self.flags = np.zeros((self.rows, self.cols), dtype=bool)
-        self.game_over = False
-        self.win = False
-
-        # 在地图上随机放置雷
-        mine_positions = random.sample(range(self.rows * self.cols), self.mines)
-        for pos in mine_positions:
-            x, y = divmod(pos, self.cols)
-            self.board[x, y] = -1  # -1 表示雷
-
-        # 为每个空格计算周围雷的数量
-        for x in range(self.rows):
-            for y in range(self.cols):
-                if self.board[x, y] == -1:
-                    continue
-                count = sum(self.board[nx, ny] == -1 for nx, ny in self.get_neighbors(x, y))
-                self.board[x, y] = count
-
-        # 将地图放置到50x50的框架内，左上角为小地图位置
-        self.full_board = np.full((50, 50), -2, dtype=np.int8)  # -2表示未揭示的格子
-        self.full_board[:self.rows, :self.cols] = self.board
-
-        # 生成“地图边界”
-        self.boundary = np.zeros((50, 50), dtype=bool)
-        self.boundary[:self.rows, :self.cols] = True  # 将小地图的范围标记为边界
-
-    def get_neighbors(self, x, y):
-        return [(x+dx, y+dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
-                if (dx, dy) != (0, 0) and 0 <= x+dx < self.rows and 0 <= y+dy < self.cols]
-
-    def reveal(self, x, y):
-        # 检查是否为非法格子（边界或已揭示）
-        if not self.boundary[x, y] or self.revealed[x, y] or self.flags[x, y] or self.game_over:
-            return False
-        self.revealed[x, y] = True
-        if self.board[x, y] == -1:
-            self.game_over = True
-        elif self.board[x, y] == 0:
-            for nx, ny in self.get_neighbors(x, y):
-                if not self.revealed[nx, ny]:
-                    self.reveal(nx, ny)
-        return True
-
-    def flag(self, x, y):
-        if not self.revealed[x, y]:
-            self.flags[x, y] = not self.flags[x, y]
-
-    def check_win(self):
-        if self.game_over:
-            return False
-        return np.sum(self.revealed) == (self.rows * self.cols - self.mines)
-
-    def is_boundary(self, x, y):
-        return not self.boundary[x, y]  # 判断是否是地图外的格子
-
-# 环境封装
-class MineSweeperEnv(gym.Env):
-    metadata = {"render_modes": ["human"]}
-
-    def __init__(self):
-        super().__init__()
-        self.game = SimpleMineSweeper()
-        self.observation_space = spaces.Box(low=-2, high=8,
-                                            shape=(50, 50),
-                                            dtype=np.int8)
-        self.action_space = spaces.MultiDiscrete([50, 50, 2])  # 50x50的地图
-        self.reset()
-
-    def reset(self, seed=None, options=None):
-        super().reset(seed=seed)
-        self.game.reset()
-        return self.get_state(), {}
-
-    def get_state(self):
-        state = np.full((50, 50), -2, dtype=np.int8)
-        for x in range(self.game.rows):
-            for y in range(self.game.cols):
-                if self.game.revealed[x, y]:
-                    state[x, y] = self.game.board[x, y]
-                elif self.game.flags[x, y]:
-                    state[x, y] = -1
-        return state
-
-    def step(self, action):
-        x, y, action_type = action
-        reward = 0
-        done = False
-
-        # 检查是否操作了非法格子
-        if self.game.is_boundary(x, y):
-            reward = -50  # 处罚
-            done = True
-            return self.get_state(), reward, done, False, {}
-
-        if self.game.revealed[x, y] or self.game.flags[x, y]:
-            reward = -50
-            done = True
-            return self.get_state(), reward, done, False, {}
-
-        if action_type == 0:  # 揭示
-            if not self.game.reveal(x, y):
-                reward = -50
-                done = True
-            else:
-                reward = 1
-        elif action_type == 1:  # 插旗
-            self.game.flag(x, y)
-            reward = 5 if self.game.board[x, y] == -1 else -10
-
-        if self.game.check_win():
-            reward = 50
-            done = True
-
-        return self.get_state(), reward, done, False, {}
-    
-
-# **多进程环境**
-def make_env():
-    return lambda: MineSweeperEnv()
-
-# 修改计算平均每局步数和训练速度的逻辑
-if __name__ == "__main__":
-    num_envs = 20  # 训练时并行的环境数
-    env = SubprocVecEnv([make_env() for _ in range(num_envs)])
-
-    model_path = "minesweeper_ppo.zip"
-    
-    # 如果已有训练模型，加载继续训练
-    if os.path.exists(model_path):
-        print("加载已有模型继续训练...")
-        model = PPO.load(model_path, env=env)
-    else:
-        print("创建新模型...")
-        model = PPO("MlpPolicy", env, verbose=0)
-
-    total_rounds = 1000
-    timesteps_per_round = 1000
-
-    print("开始训练扫雷 AI...")
-    start_time = time.time()
-    last_update_time = start_time
-    completed_rounds = 0
-    initial_timesteps = model.num_timesteps  # 记录初始训练步数
-    pbar = tqdm(total=total_rounds, desc="训练进度", unit="局")
-
-    while completed_rounds < total_rounds:
-        # 训练一轮
-        model.learn(total_timesteps=timesteps_per_round)
-        
-        # 更新当前步数
-        new_timesteps = model.num_timesteps
-        trained_steps = new_timesteps - initial_timesteps  # 计算实际训练步数
-        initial_timesteps = new_timesteps  # 更新步数
-
-        # 手动更新完成的局数
-        completed_rounds += num_envs  # 记录完成的局数
-
-        # 计算每局步数和训练速度
-        current_time = time.time()
-        if current_time - last_update_time >= 10:
-            elapsed = current_time - start_time
-            speed = trained_steps / elapsed  # 训练速度：步数 / 时间
-            avg_steps = trained_steps / completed_rounds  # 平均每局步数
-            pbar.set_postfix({'训练速度': f'{speed:.2f} 步/秒', '平均每局步数': f'{avg_steps:.2f}'})
-            last_update_time = current_time
-
-        pbar.update(num_envs)
-
-    pbar.close()
-    model.save(model_path)
-    print("训练完成，模型已保存！")
+#mine_sweep_to_train_ai.py
+import argparse
+import time
+from collections import deque
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.save_util import load_from_zip_file
+from stable_baselines3.common.vec_env import VecEnv
+try:
+    from sb3_contrib import MaskablePPO  # 支持动作掩码的 PPO
+except ImportError:
+    MaskablePPO = None
+from tqdm import tqdm
+import random
+import os
+from mine_sweep_engine import MineSweeperEngine, count_neighbor_mines
+from mine_sweep_policy import CellPolicy
+from mine_sweep_observation import (OBS_SIZE, OUTSIDE, UNKNOWN, FLAG, ObservationBuffer,
+                                    action_masks, check_spaces, decode_action, random_board_config)
+
+def dilate(mask):
+    """把 (B, H, W) 的布尔掩码向周围 8 格扩展一格（先横向再纵向，可分离）"""
+    result = mask.copy()
+    result[:, :, 1:] |= mask[:, :, :-1]
+    result[:, :, :-1] |= mask[:, :, 1:]
+    rows = result.copy()
+    result[:, 1:] |= rows[:, :-1]
+    result[:, :-1] |= rows[:, 1:]
+    return result
+
+# 环境封装
+class MineSweeperEnv(gym.Env):
+    metadata = {"render_modes": ["human"]}
+
+    def __init__(self, rows=None, cols=None, mines=None, obs_size=OBS_SIZE):
+        super().__init__()
+        self.rows, self.cols, self.mines = random_board_config(max_size=obs_size, rows=rows, cols=cols, mines=mines)
+        if max(self.rows, self.cols) > obs_size:
+            raise ValueError(f"棋盘 {self.rows}x{self.cols} 超出观测大小 {obs_size}x{obs_size}")
+        self.obs_size = obs_size
+        self.game = MineSweeperEngine(self.rows, self.cols, self.mines)
+        self.observation = ObservationBuffer(self.game, obs_size)
+        self.observation_space = spaces.Box(low=OUTSIDE, high=8,
+                                            shape=(obs_size, obs_size),
+                                            dtype=np.int8)
+        self.action_space = spaces.Discrete(2 * obs_size * obs_size)  # 观测内的每个格子 x (打开, 插旗)
+        self.reset()
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        # 棋盘种子取自环境自身的随机数生成器，reset(seed=...) 后整个回合可复现
+        self.game.reset(self.rows, self.cols, self.mines, seed=int(self.np_random.integers(2 ** 32)))
+        self.game.generate_mines()  # 训练时开局即布雷，不保证首次点击安全
+        self.observation.reset()
+
+        # 生成“地图边界”：将小地图放置到观测框架内，左上角为小地图位置
+        self.boundary = np.zeros((self.obs_size, self.obs_size), dtype=bool)
+        self.boundary[:self.rows, :self.cols] = True
+        return self.get_state(), {}
+
+    def get_state(self, changed=None):
+        """增量同步观测缓冲区后返回副本（VecEnv 会保留回合结束时的观测，不能直接交出常驻缓冲区）"""
+        return self.observation.sync(changed).copy()
+
+    def action_masks(self):
+        """合法动作掩码（地图内未打开且未插旗的格子），供 MaskablePPO 使用"""
+        return self.observation.action_masks()
+
+    def step(self, action):
+        x, y, action_type = decode_action(int(action), self.obs_size)
+        reward = 0
+        done = False
+
+        # 检查是否操作了非法格子
+        if not self.boundary[x, y]:
+            reward = -50  # 处罚
+            done = True
+            return self.get_state(), reward, done, False, {}
+
+        if self.game.revealed[x, y] or self.game.flags[x, y]:
+            reward = -50
+            done = True
+            return self.get_state(), reward, done, False, {}
+
+        changed = None
+        if action_type == 0:  # 揭示
+            changed = self.game.open_cell(x, y)
+            if changed is None:
+                reward = -50
+                done = True
+            elif self.game.exploded is not None:  # 踩雷
+                reward = -50
+                done = True
+            else:
+                reward = 1
+        elif action_type == 1:  # 插旗
+            self.game.toggle_flag(x, y)
+            changed = [(x, y)]
+            reward = 5 if self.game.mines[x, y] else -10
+
+        if self.game.win:
+            reward = 50
+            done = True
+
+        state = self.get_state(changed)
+        if not done and not self.action_masks().any():  # 剩下的格子都插了旗，已经没有合法动作
+            done = True
+        return state, reward, done, False, {}
+    
+
+# **单进程批量环境**
+class MineSweeperVecEnv(VecEnv):
+    """在一个进程里用 (B, size, size) 的数组同时推进 B 局游戏，规则和奖励与 MineSweeperEnv 一致
+
+    每个环境结束后自动重开，结束时的观测放在 info["terminal_observation"] 中（SB3 VecEnv 约定）。
+    """
+
+    def __init__(self, num_envs, rows=None, cols=None, mines=None, obs_size=OBS_SIZE):
+        self.render_mode = None
+        if max(rows or 0, cols or 0) > obs_size:
+            raise ValueError(f"棋盘 {rows}x{cols} 超出观测大小 {obs_size}x{obs_size}")
+        self.fixed_config = (rows, cols, mines)
+        self.obs_size = obs_size
+        self.rngs = [random.Random() for _ in range(num_envs)]
+        shape = (num_envs, obs_size, obs_size)
+        self.mines = np.zeros(shape, dtype=bool)
+        self.numbers = np.zeros(shape, dtype=np.int8)
+        self.revealed = np.zeros(shape, dtype=bool)
+        self.flags = np.zeros(shape, dtype=bool)
+        self.boundary = np.zeros(shape, dtype=bool)
+        self.safe_remaining = np.zeros(num_envs, dtype=np.int64)
+        self.obs = np.full(shape, OUTSIDE, dtype=np.int8)  # 常驻观测，每步只更新变化的格子
+        self.actions = None
+        observation_space = spaces.Box(low=OUTSIDE, high=8, shape=(obs_size, obs_size), dtype=np.int8)
+        action_space = spaces.Discrete(2 * obs_size * obs_size)
+        super().__init__(num_envs, observation_space, action_space)
+
+    def reset_envs(self, indices):
+        """重开指定的几局：每局只抽取配置和随机键，布雷和数字统一用数组运算完成"""
+        size = self.obs_size
+        keys = np.empty((len(indices), size * size))
+        mine_counts = np.empty(len(indices), dtype=np.int64)
+        for row, i in enumerate(indices):
+            if self._seeds[i] is not None:
+                self.rngs[i] = random.Random(self._seeds[i])
+            rng = self.rngs[i]
+            rows, cols, mines = random_board_config(rng, size, *self.fixed_config)
+            mine_counts[row] = max(0, min(mines, rows * cols - 1))
+            self.boundary[i] = False
+            self.boundary[i, :rows, :cols] = True
+            self.safe_remaining[i] = rows * cols - mine_counts[row]
+            keys[row] = np.random.default_rng(rng.getrandbits(64)).random(size * size)
+
+        # 地图内随机键最小的 mines 个格子放雷（等价于无放回均匀抽样）
+        keys[~self.boundary[indices].reshape(len(indices), -1)] = np.inf
+        thresholds = np.sort(keys, axis=1)[np.arange(len(indices)), np.maximum(mine_counts - 1, 0)]
+        mines = (keys <= thresholds[:, None]) & (mine_counts[:, None] > 0)
+        self.mines[indices] = mines.reshape(len(indices), size, size)
+        self.revealed[indices] = False
+        self.flags[indices] = False
+        self.numbers[indices] = count_neighbor_mines(self.mines[indices])
+        self.obs[indices] = np.where(self.boundary[indices], UNKNOWN, OUTSIDE)
+
+    def reset(self):
+        self.reset_envs(np.arange(self.num_envs))
+        self._reset_seeds()
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        return self.obs.copy()
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        index = np.arange(self.num_envs)
+        x, y, action_type = decode_action(self.actions, self.obs_size)
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+
+        # 非法操作：地图外、已打开或已插旗的格子
+        illegal = ~self.boundary[index, x, y] | self.revealed[index, x, y] | self.flags[index, x, y]
+        hit_mine = self.mines[index, x, y]
+        opening = ~illegal & (action_type == 0)
+        flagging = ~illegal & (action_type == 1)
+        exploded = opening & hit_mine
+        safe = opening & ~hit_mine
+
+        rewards[illegal | exploded] = -50
+        rewards[safe] = 1
+        rewards[flagging] = np.where(hit_mine[flagging], 5, -10)
+        self.flags[index[flagging], x[flagging], y[flagging]] = True
+        self.obs[index[flagging], x[flagging], y[flagging]] = FLAG
+        self.reveal(index[safe], x[safe], y[safe])
+
+        won = safe & (self.safe_remaining == 0)
+        rewards[won] = 50
+        # 没有结束的环境可能已经没有未打开且未插旗的格子（例如其余格子都插了旗），没有合法动作时同样结束
+        dones = illegal | exploded | won
+        stuck = np.zeros(self.num_envs, dtype=bool)
+        stuck[~dones] = ~(self.obs[~dones] == UNKNOWN).any(axis=(1, 2))
+        dones |= stuck
+
+        infos = [{} for _ in range(self.num_envs)]
+        done_indices = np.flatnonzero(dones)
+        if done_indices.size:
+            for i in done_indices:
+                infos[i]["terminal_observation"] = self.obs[i].copy()
+                infos[i]["TimeLimit.truncated"] = False
+                infos[i]["is_success"] = bool(won[i])
+            self.reset_envs(done_indices)
+            self._reset_seeds()
+        # 返回副本：SB3 会保存观测，常驻缓冲区下一步还会被原地修改
+        return self.obs.copy(), rewards, dones, infos
+
+    def reveal(self, envs, x, y):
+        """批量洪水填充：所有需要展开的棋盘一起按层扩展，直到没有新的格子"""
+        self.revealed[envs, x, y] = True
+        self.obs[envs, x, y] = self.numbers[envs, x, y]
+        self.safe_remaining[envs] -= 1
+        zero = self.numbers[envs, x, y] == 0
+        envs, x, y = envs[zero], x[zero], y[zero]
+        if not envs.size:
+            return
+
+        zero = self.numbers[envs] == 0
+        closed = ~self.revealed[envs] & ~self.flags[envs] & self.boundary[envs]
+        region = np.zeros((envs.size, self.obs_size, self.obs_size), dtype=bool)
+        region[np.arange(envs.size), x, y] = True
+        active = np.arange(envs.size)  # 仍在扩展的棋盘，已停止的不再参与后续计算
+        frontier = region.copy()
+        while active.size:
+            frontier = dilate(frontier & zero[active]) & closed[active] & ~region[active]
+            growing = frontier.reshape(active.size, -1).any(axis=1)
+            active, frontier = active[growing], frontier[growing]
+            region[active] |= frontier
+
+        self.safe_remaining[envs] -= region.sum(axis=(1, 2)) - 1
+        self.revealed[envs] |= region
+        self.obs[envs] = np.where(region, self.numbers[envs], self.obs[envs])
+
+    def action_masks(self):
+        """(B, 2 * size²) 的合法动作掩码，直接由常驻观测得到"""
+        return action_masks(self.obs)
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """批量方法一次算出所有环境的结果（第一维是环境），再按环境拆开，例如 action_masks"""
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result[i] for i in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
+
+# **训练监控与检查点**
+class TrainingMonitor(BaseCallback):
+    """统计真实的环境步数/秒、局数/秒、胜率和平均每局步数，并定期原子地保存检查点"""
+
+    def __init__(self, model_path, checkpoint_interval=600, report_interval=10, window=1000, pbar=None):
+        super().__init__()
+        self.model_path = model_path
+        self.checkpoint_interval = checkpoint_interval  # 秒
+        self.report_interval = report_interval  # 秒
+        self.pbar = pbar
+        self.wins = deque(maxlen=window)  # 最近 window 局的胜负和步数
+        self.lengths = deque(maxlen=window)
+        self.episode_steps = None
+        self.episodes = 0
+
+    def _on_training_start(self):
+        self.episode_steps = np.zeros(self.training_env.num_envs, dtype=np.int64)
+        self.last_report = self.last_checkpoint = time.perf_counter()
+        self.report_steps = self.num_timesteps
+        self.report_episodes = 0
+
+    def _on_step(self):
+        dones = self.locals["dones"]
+        self.episode_steps += 1
+        for i in np.flatnonzero(dones):
+            self.wins.append(bool(self.locals["infos"][i].get("is_success", False)))
+            self.lengths.append(self.episode_steps[i])
+            self.episodes += 1
+        self.episode_steps[dones] = 0
+
+        now = time.perf_counter()
+        if now - self.last_report >= self.report_interval:
+            self.report(now)
+        if now - self.last_checkpoint >= self.checkpoint_interval:
+            self.save_checkpoint()
+            self.last_checkpoint = now
+        return True
+
+    def report(self, now):
+        elapsed = now - self.last_report
+        stats = {
+            "steps_per_sec": (self.num_timesteps - self.report_steps) / elapsed,
+            "episodes_per_sec": (self.episodes - self.report_episodes) / elapsed,
+            "win_rate": float(np.mean(self.wins)) if self.wins else 0.0,
+            "mean_episode_length": float(np.mean(self.lengths)) if self.lengths else 0.0,
+        }
+        for key, value in stats.items():
+            self.logger.record(f"minesweeper/{key}", value)
+        if self.pbar is not None:
+            self.pbar.update(self.num_timesteps - self.pbar.n)
+            self.pbar.set_postfix({"步/秒": f"{stats['steps_per_sec']:.0f}",
+                                   "局/秒": f"{stats['episodes_per_sec']:.1f}",
+                                   "胜率": f"{stats['win_rate']:.3f}",
+                                   "平均每局步数": f"{stats['mean_episode_length']:.1f}"})
+        self.last_report = now
+        self.report_steps = self.num_timesteps
+        self.report_episodes = self.episodes
+
+    def save_checkpoint(self):
+        save_model_atomic(self.model, self.model_path)
+
+def save_model_atomic(model, path):
+    """先写临时文件再替换，训练中途崩溃也不会留下写了一半的模型"""
+    temp_path = path + ".tmp"
+    model.save(temp_path)
+    os.replace(temp_path, path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="训练扫雷 AI")
+    parser.add_argument("--timesteps", type=int, default=20_000_000, help="总训练步数（从检查点恢复时包含已训练的步数）")
+    parser.add_argument("--envs", type=int, default=20, help="并行的环境数（同一进程内批量推进）")
+    parser.add_argument("--model", default="minesweeper_ppo.zip", help="模型/检查点路径")
+    parser.add_argument("--checkpoint-interval", type=float, default=600, help="检查点间隔（秒）")
+    parser.add_argument("--report-interval", type=float, default=10, help="统计输出间隔（秒）")
+    parser.add_argument("--fresh", action="store_true", help="忽略已有检查点，从头训练")
+    parser.add_argument("--tensorboard", help="TensorBoard 日志目录")
+    parser.add_argument("--rows", type=int, help="固定行数（默认每局随机）")
+    parser.add_argument("--cols", type=int, help="固定列数（默认每局随机）")
+    parser.add_argument("--mines", type=int, help="固定雷数（默认每局随机）")
+    parser.add_argument("--obs-size", type=int, default=OBS_SIZE,
+                        help="观测边长（新建模型时生效，随机棋盘的边长不超过它；恢复检查点时沿用模型的观测大小）")
+    parser.add_argument("--pretrain", help="新建模型时先用该目录下的逻辑AI专家数据做行为克隆（见 mine_sweep_expert.py）")
+    parser.add_argument("--pretrain-epochs", type=int, default=3, help="行为克隆的轮数")
+    args = parser.parse_args()
+
+    # 安装了 sb3-contrib 时用 MaskablePPO，只在合法动作中采样
+    algorithm = MaskablePPO or PPO
+
+    # 如果已有检查点，从中恢复继续训练（步数接着累计）
+    if os.path.exists(args.model) and not args.fresh:
+        # 先只读出检查点的观测和动作空间，按模型的观测大小创建环境，再随环境一起加载（环境数可以与上次不同）
+        data, _, _ = load_from_zip_file(args.model, device="cpu")
+        check_spaces(data["observation_space"], data["action_space"])
+        env = MineSweeperVecEnv(args.envs, args.rows, args.cols, args.mines, data["observation_space"].shape[-1])
+        model = algorithm.load(args.model, env=env, tensorboard_log=args.tensorboard)
+        print(f"从检查点恢复，已训练 {model.num_timesteps} 步")
+    else:
+        if args.pretrain:
+            from mine_sweep_expert import ExpertDataset, pretrain
+            dataset = ExpertDataset(args.pretrain)
+            if dataset.obs_size > args.obs_size:
+                parser.error(f"专家数据的观测为 {dataset.obs_size}x{dataset.obs_size}，大于 --obs-size {args.obs_size}")
+        print("创建新模型...")
+        env = MineSweeperVecEnv(args.envs, args.rows, args.cols, args.mines, args.obs_size)
+        model = algorithm(CellPolicy, env, verbose=0,  # 全卷积策略，计算量随实际棋盘面积变化
+                          tensorboard_log=args.tensorboard)
+        if args.pretrain:
+            print(f"用 {len(dataset)} 个专家样本做行为克隆预训练...")
+            pretrain(model, dataset, epochs=args.pretrain_epochs)
+            save_model_atomic(model, args.model)
+
+    remaining = args.timesteps - model.num_timesteps
+    pbar = tqdm(total=args.timesteps, initial=model.num_timesteps, desc="训练进度", unit="步")
+    monitor = TrainingMonitor(args.model, args.checkpoint_interval, args.report_interval, pbar=pbar)
+
+    print("开始训练扫雷 AI...")
+    try:
+        if remaining > 0:
+            # 一次 learn 跑完全部步数，rollout 状态不会被反复重置
+            model.learn(total_timesteps=remaining, callback=monitor, reset_num_timesteps=False)
+    except KeyboardInterrupt:
+        print("训练被中断，保存检查点...")
+    finally:
+        pbar.update(model.num_timesteps - pbar.n)
+        pbar.close()
+        save_model_atomic(model, args.model)
+    print("训练完成，模型已保存！")
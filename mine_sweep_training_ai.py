@@ -1,67 +1,132 @@
-# mine_sweep_training_ai.py
-from stable_baselines3 import PPO
-import numpy as np
-from PyQt5.QtCore import QTimer
-
-class MineSweeperTrainingAI:
-    def __init__(self, game, model_path = "minesweeper_ppo"):
-        self.game = game
-        self.model = PPO.load(model_path)
-        self.is_active = False
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.play_step)
-        self.ai_stop_callback = None
-
-    def start_ai(self):
-        self.is_active = True
-        self.timer.start(100)
-
-    def stop_ai(self):
-        self.is_active = False
-        self.timer.stop()
-
-    def get_action(self):
-        state = self.get_state()
-        action, _states = self.model.predict(state)
-        return action
-
-    def get_state(self):
-        # 获取实际游戏的行列数
-        rows = self.game.rows
-        cols = self.game.cols
-
-        # 50x50的状态矩阵
-        state = np.full((50, 50), -2, dtype=np.int8)  # 默认值 -2 表示未被揭示且未插旗的格子（边界）
-
-        # 填充实际游戏的小地图
-        for x in range(rows):
-            for y in range(cols):
-                button = self.game.buttons[x][y]
-
-                if button.is_revealed:
-                    state[x, y] = button.number  # 已揭示格子的数字
-                elif button.is_flag:
-                    state[x, y] = -1  # 插旗的格子
-
-        return state
-
-    def play_step(self):
-        if self.game.game_over:
-            self.stop_ai()
-            return
-
-        action = self.get_action()
-        x, y, action_type = action
-
-        # 确保AI不会尝试操作地图边界外的格子
-        if x >= self.game.rows or y >= self.game.cols:
-            return
-
-        if action_type == 0:
-            self.game.handle_left_click(x, y)  # 左键点击
-        elif action_type == 1:
-            self.game.handle_right_click(x, y)  # 右键插旗
-
-
-if __name__ == "__main__":
-    print("这是扫雷的强化学习训练AI")
+# mine_sweep_training_ai.py
+import importlib.util
+import os
+import threading
+import time
+import traceback
+from functools import partial
+from PyQt5.QtWidgets import QMessageBox
+from PyQt5.QtCore import QTimer
+from mine_sweep_ai_worker import AIWorker
+from mine_sweep_observation import ObservationBuffer, decode_action, load_model, predict_masked
+from mine_sweep_profiler import Profiler
+
+class MineSweeperTrainingAI:
+    def __init__(self, game, model_path = "minesweeper_ppo"):
+        self.game = game
+        self.model_path = model_path
+        self.model = None  # 第一次使用时才加载（导入 torch 需要数秒）
+        self.load_error = None
+        self.load_lock = threading.Lock()
+        self.is_active = False
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.play_step)
+        self.ai_stop_callback = None
+        self.observation = ObservationBuffer(game.engine)
+        self.worker = AIWorker()  # 策略网络的前向计算在后台线程中进行，界面不会卡顿
+        self.session = 0  # 每次启动/停止加一，旧会话的推理结果直接丢弃
+        self.predicting = False
+        self.profiler = Profiler()  # 分阶段计时，默认关闭，界面上可以打开
+
+    def available(self):
+        """不导入 torch，只检查依赖和模型文件是否存在；返回 (是否可用, 原因)"""
+        if importlib.util.find_spec("stable_baselines3") is None:
+            return False, "stable-baselines3 is not installed"
+        if not (os.path.exists(self.model_path) or os.path.exists(self.model_path + ".zip")):
+            return False, f"Model file {self.model_path}.zip not found"
+        return True, ""
+
+    def load(self):
+        """导入 stable-baselines3/torch 并加载模型，只执行一次；可以在后台线程中提前调用预热，失败时返回 None"""
+        with self.load_lock:
+            if self.model is None and self.load_error is None:
+                try:
+                    self.model = load_model(self.model_path)
+                except Exception as e:  # 模型文件损坏、版本不兼容等，界面上提示即可
+                    self.load_error = str(e)
+        return self.model
+
+    def fits(self):
+        """当前棋盘能否放进模型的观测（模型的观测大小在训练时确定，默认 50x50）"""
+        size = self.model.observation_space.shape[-1]
+        return self.game.rows <= size and self.game.cols <= size
+
+    def start_ai(self):
+        self.is_active = True
+        self.session += 1
+        size = self.model.observation_space.shape[-1]
+        if self.observation.size != size:
+            self.observation = ObservationBuffer(self.game.engine, size)
+        self.observation.reset()  # 期间可能换了新局或有手动操作，先整体重建一次
+        self.timer.start(100)
+
+    def stop_ai(self):
+        self.is_active = False
+        self.session += 1
+        self.timer.stop()
+
+    def get_action(self, state, masks):
+        """只在合法动作（地图内未打开且未插旗的格子）中选择，与训练时的动作掩码一致"""
+        with self.profiler.phase("predict"):
+            action = predict_masked(self.model, state, masks)
+        return decode_action(int(action), self.observation.size)
+
+    def get_state(self, changed=None):
+        """size x size 的状态矩阵（只读视图）：-3 地图外，-2 未打开，-1 插旗，其余为已打开格子的数字"""
+        return self.observation.sync(changed)
+
+    def play_step(self):
+        if self.predicting:
+            return
+
+        if self.game.game_over:
+            self.stop_ai()
+            return
+
+        with self.profiler.phase("state"):
+            state = self.get_state()
+            masks = self.observation.action_masks()
+        if not masks.any():  # 剩下的格子都插了旗，没有可选的动作
+            self.ai_stop_callback()
+            return
+
+        # 观测复制一份交给后台线程，推理期间界面线程可以继续同步缓冲区
+        self.predicting = True
+        self.timer.stop()
+        self.worker.submit(self.get_action, state.copy(), masks,
+                           callback=partial(self.on_action, self.session, self.game.engine.version,
+                                            time.perf_counter()))
+
+    def on_action(self, session, version, submitted, action, error):
+        """在界面线程中执行动作；AI 已停止或棋盘在推理期间被改动过时动作作废，重新推理；推理出错时停止 AI 并提示"""
+        self.predicting = False
+        self.profiler.add("latency_ms", (time.perf_counter() - submitted) * 1000)
+        if error is not None:
+            self.profiler.end_step()
+            if self.is_active:
+                self.report_error(error)
+            return
+        if session != self.session or not self.is_active:
+            return
+        self.timer.start(100)
+        if self.game.engine.version != version:
+            return
+
+        x, y, action_type = action
+        with self.profiler.phase("apply"):
+            if action_type == 0:
+                changed = self.game.handle_left_click(x, y)  # 左键点击
+                self.observation.sync(changed)  # 只更新这一步变化的格子
+            elif action_type == 1:
+                self.game.handle_right_click(x, y)  # 右键插旗
+                self.observation.sync([(x, y)])
+        self.profiler.end_step()
+
+    def report_error(self, error):
+        traceback.print_exception(error)
+        self.ai_stop_callback()
+        QMessageBox.warning(self.game, "AI Error", f"Training AI stopped because prediction failed:\n{error!r}")
+
+
+if __name__ == "__main__":
+    print("这是扫雷的强化学习训练AI")